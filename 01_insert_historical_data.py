@@ -10,13 +10,29 @@ vsu = importlib.import_module('vsutils')
 # importlib.reload(vsu)
 spl = importlib.import_module('scraping.polish')
 # importlib.reload(spl)
+spc = importlib.import_module('scraping.cache')
+# importlib.reload(spc)
+vsm = importlib.import_module('vsutils.metrics')
+# importlib.reload(vsm)
 dbt = importlib.import_module('dbtools')
 # importlib.reload(dbt)
+ppl = importlib.import_module('pipeline')
+# importlib.reload(ppl)
 
 
 # %% Get config and database engine
 config = vsu.get_config()
+# Relative paths of the config are relative to its directory
+cache_dir = vsu.resolve_path(config['paths']['cache_dir'])
+report_dir = vsu.resolve_path(config['paths']['report_dir'])
+vsm.reset()
 db = dbt.get_engine('polish')
+dbt.create_indexes(db)
+dbt.create_caches(db)
+dbt.aggregates.create(db)
+# Rows of matches_info hashed before their columns were fixed would be
+# inserted again (see pipeline.rehash_matches_info)
+ppl.rehash_matches_info(db)
 
 
 # %% Getting all combinations for which the data should be fetched
@@ -32,29 +48,38 @@ combs = pd.concat(combs, ignore_index=True)
 
 
 # %% Fetch and upload data
-for i in range(len(combs.index)):
-    league = combs.League[i]
-    season = combs.Season[i]
+# League-seasons are fetched by several processes, a single writer
+# (this process) inserts them. Every chunk is committed with the default
+# (durable) pragmas, so a crash leaves the inserted ones for a resume.
+failed = ppl.backfill(db, combs,
+                      processes=config['backfill']['processes'],
+                      workers=config['scraping']['workers'],
+                      chunk_size=config['scraping']['chunk_size'],
+                      queue_size=config['backfill']['queue_size'],
+                      # Without resume, everything is fetched and parsed
+                      # again (e.g. after a fix of a parser)
+                      resume=config['backfill']['resume'],
+                      # Past seasons do not change, so pages are served
+                      # from the cache if possible ('read', 'replay' re-parses
+                      # the history from the cache only, without requests)
+                      cache_dir=cache_dir,
+                      cache_mode=config['backfill']['cache_mode'])
 
-    print('Fetching data for {league}: {start}/{end}...'.format(
+for league, season, error in failed:
+    print('Not inserted {league}: {season} ({error})'.format(
         league=league,
-        start=season,
-        end=season + 1))
-
-    tabs = spl.fetch_all(league, season)
-
-    for tab in tabs.keys():
-        vsu.add_hash(tabs[tab])
-        vsu.add_timestamp(tabs[tab])
-
-
-    # %% Inserting into database
-    for tab in tabs.keys():
-        rows_aff = tabs[tab].to_sql(name=tab,
-                                    con=db,
-                                    index=False,
-                                    if_exists='append')
-        print("Inserted {n} rows into '{tab}'...".format(
-              n=rows_aff,
-              tab=tab))
-        # db.connect().execute(sql.text('SELECT * FROM ' + tab)).fetchall()
+        season=season,
+        error=error))
+
+
+# %% Cache maintenance
+spc.evict(cache_dir,
+          max_size=config['cache']['max_size_mb'] * 2**20,
+          max_age=config['cache']['max_age_days'] * 24 * 3600)
+
+
+# %% Run report
+# Requests, parsing, hashing and inserts by stage, compare two reports with
+# volleystats.py compare
+print('Report written to {path}'.format(
+    path=vsm.write_report(report_dir, 'backfill')))
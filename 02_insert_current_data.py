@@ -10,15 +10,34 @@ vsu = importlib.import_module('vsutils')
 # importlib.reload(vsu)
 spl = importlib.import_module('scraping.polish')
 # importlib.reload(spl)
+spc = importlib.import_module('scraping.cache')
+# importlib.reload(spc)
+vsm = importlib.import_module('vsutils.metrics')
+# importlib.reload(vsm)
 dbt = importlib.import_module('dbtools')
 # importlib.reload(dbt)
+ppl = importlib.import_module('pipeline')
+# importlib.reload(ppl)
 
 
 # %% Get config and database engine
 config = vsu.get_config()
+# Relative paths of the config are relative to its directory
+cache_dir = vsu.resolve_path(config['paths']['cache_dir'])
+report_dir = vsu.resolve_path(config['paths']['report_dir'])
+vsm.reset()
 db = dbt.get_engine('polish')
+dbt.create_indexes(db)
+dbt.create_caches(db)
+dbt.aggregates.create(db)
+# Rows of matches_info hashed before their columns were fixed would be
+# inserted again (see pipeline.rehash_matches_info)
+ppl.rehash_matches_info(db)
 season = spl.current_season()
 
+# Current season pages change, they are always downloaded and only stored
+spl.set_cache(cache_dir, mode='write')
+
 
 # %% Fetch and upload data
 for league in config['leagues']['polish']:
@@ -27,34 +46,54 @@ for league in config['leagues']['polish']:
         start=season,
         end=season + 1))
 
-    tabs = spl.fetch_all(league, season)
+    # Finished matches are not fetched again, teams and players are (rosters
+    # and players' information change during the season), but only their
+    # changed pages are parsed
+    if config['refresh']['incremental']:
+        skip = dbt.get_complete_ids(db, league, season, closed=False)
+    else:
+        # Players whose pages were redirected recently are not requested
+        skip = {'PlayerID': dbt.get_skipped_ids(db, league, season)}
+
+    # Match, team and player pages unchanged since they were inserted (by
+    # the current version of the parsers) are not parsed
+    if config['refresh']['fingerprints']:
+        fingerprints = dbt.get_fingerprints(db, league, season)
+    else:
+        fingerprints = None
 
-    for tab in tabs.keys():
-        vsu.add_hash(tabs[tab])
-        vsu.add_timestamp(tabs[tab])
+    # Match, team and player pages not modified since then are not even
+    # downloaded (hosts which do not send validators are compared by
+    # fingerprints)
+    if config['refresh']['conditional_requests']:
+        validators = dbt.get_validators(db, league, season,
+                                        spl.PARSER_VERSION)
+    else:
+        validators = None
+
+    chunks = spl.iter_fetch_all(league, season,
+                                workers=config['scraping']['workers'],
+                                skip=skip,
+                                chunk_size=config['scraping']['chunk_size'],
+                                fingerprints=fingerprints,
+                                validators=validators)
 
 
     # %% Inserting into database
-    hash_query = """SELECT DISTINCT Hash
-    FROM {tab}
-    WHERE Season = {season}
-        AND League = '{league}'"""
-
-    db_con = db.connect()
-    for tab in tabs.keys():
-        curr_query = hash_query.format(tab=tab, season=season, league=league)
-        curr_hashes = db_con.execute(sql.text(curr_query)).fetchall()
-        curr_hashes = set(x[0] for x in curr_hashes)
-
-        ins_tab = tabs[tab]
-        ins_tab = ins_tab[~ins_tab.Hash.isin(curr_hashes)]
-
-        if ins_tab.shape[0] > 0:
-            rows_aff = ins_tab.to_sql(name=tab,
-                                      con=db,
-                                      index=False,
-                                      if_exists='append')
-            print("Inserted {n} rows into '{tab}'...".format(
-                n=rows_aff,
-                tab=tab))
-            # db.connect().execute(sql.text('SELECT * FROM ' + tab)).fetchall()
+    # Chunks are inserted as soon as they are fetched, rows already present
+    # (same primary key with Hash) are skipped by SQLite
+    rows_aff = ppl.insert_chunks(db, chunks)
+    ppl.print_inserted(rows_aff, skip_empty=True)
+
+
+# %% Cache maintenance
+spc.evict(cache_dir,
+          max_size=config['cache']['max_size_mb'] * 2**20,
+          max_age=config['cache']['max_age_days'] * 24 * 3600)
+
+
+# %% Run report
+# Requests, parsing, hashing and inserts by stage, compare two reports with
+# volleystats.py compare
+print('Report written to {path}'.format(
+    path=vsm.write_report(report_dir, 'refresh')))
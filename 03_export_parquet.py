@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import importlib
+
+vsu = importlib.import_module('vsutils')
+# importlib.reload(vsu)
+dbt = importlib.import_module('dbtools')
+# importlib.reload(dbt)
+dpq = importlib.import_module('dbtools.parquet')
+# importlib.reload(dpq)
+
+
+# %% Get config and database engine
+config = vsu.get_config()
+# Relative paths of the config are relative to its directory
+export_dir = vsu.resolve_path(config['paths']['export_dir'])
+db = dbt.get_engine('polish')
+
+
+# %% Export changed partitions
+# Only (League, Season) partitions changed since the previous export
+# are written again
+exported = dpq.export_parquet(db, export_dir)
+for tab, parts in exported.items():
+    print("Exported {n} partitions of '{tab}'...".format(n=len(parts),
+                                                         tab=tab))
+
+
+# %% Loading, e.g. in analysis notebooks
+stats = dpq.read_parquet(export_dir, 'matches_stats',
+                        columns=['PlayerID', 'TeamID', 'Points'],
+                        leagues=['PlusLiga'])
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Building match tables of a batch: per-match pd.DataFrames concatenated
+# (as fetch_match_info results were) vs columnar buffers converted once
+# (scraping.polish._match_tables). Both results are checked to be equal.
+# python benchmarks/accumulator.py [n_matches]
+
+import sys
+import os
+import timeit
+import pandas as pd
+from lxml import html
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import scraping.polish as spl
+import benchmarks.synthetic as syn
+
+
+# %% Pages
+n_matches = int(sys.argv[1]) if len(sys.argv) > 1 else 280
+
+trees = list()
+for i in range(n_matches):
+    # Old and new formats of statistics, and some matches not played yet
+    season = 2015 if i % 3 == 0 else 2022
+    ID = 1000 + i
+    text = syn.match_page(season, ID, 1, 2,
+                          list(range(100, 113)),
+                          list(range(200, 213)),
+                          played=i % 10 != 9)
+    trees.append(('PlusLiga', season, ID, html.fromstring(text)))
+print('Match pages: {n}'.format(n=len(trees)))
+
+
+# %% Benchmark
+def per_match():
+    data = list(spl.parse_match_info(tree, league, season, ID)
+                for league, season, ID, tree in trees)
+    rslt = dict()
+    for key in ['information', 'results', 'stats']:
+        tabs = list(x[key] for x in data if len(x[key]) > 0)
+        rslt[key] = pd.concat(tabs, ignore_index=True)
+    return rslt
+
+
+def columnar():
+    data = list(spl._extract_match_info(tree, league, season, ID)
+                for league, season, ID, tree in trees)
+    return spl._match_tables(data)
+
+
+expected = per_match()
+actual = columnar()
+for key in expected:
+    pd.testing.assert_frame_equal(actual[key], expected[key])
+print('Tables are equal')
+
+for label, func in [('per match', per_match), ('columnar', columnar)]:
+    times = timeit.repeat(func, number=1, repeat=5)
+    print('{label:>10}: {t:8.1f} ms, {pps:7.1f} pages/s (best of 5)'.format(
+        label=label,
+        t=min(times) * 1000,
+        pps=len(trees) / min(times)))
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Size of a synthetic multi-season database before and after the migration
+# into the compact layout (dbtools.compact), and time of inserting a season
+# again, i.e. of the dedup on primary keys, in both layouts.
+# Run from the repository root: python benchmarks/compact.py
+
+import sys
+import os
+import shutil
+import tempfile
+import timeit
+import sqlalchemy as sql
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import vsutils as vsu
+import dbtools as dbt
+from dbtools import schema
+from dbtools import compact
+from benchmarks.synthetic import season_stats, season_players, season_results
+
+
+# %% Synthetic database
+leagues = ['PlusLiga', 'Tauron Liga', 'Tauron 1. Liga']
+seasons = range(2013, 2023)
+
+tmp_dir = tempfile.TemporaryDirectory()
+paths = {'plain': tmp_dir.name + '/plain.db',
+         'compact': tmp_dir.name + '/compact.db'}
+engine = sql.create_engine('sqlite+pysqlite:///' + paths['plain'])
+schema.meta.create_all(engine, tables=list(schema.meta.tables[x]
+                                           for x in compact.TABLES))
+
+for i, league in enumerate(leagues):
+    for season in seasons:
+        stats = season_stats(season=season, seed=season)
+        stats.League = league
+        stats.MatchID += (i * 100 + season - 2000) * 1000
+
+        tabs = {'matches_stats': stats,
+                'players_info': season_players(stats, seed=season),
+                'matches_results': season_results(stats, seed=season)}
+        for tab in tabs.keys():
+            vsu.add_hash(tabs[tab])
+            vsu.add_timestamp(tabs[tab])
+        dbt.bulk_insert(engine, tabs, pragmas=dbt.BULK_PRAGMAS)
+
+engine.dispose()
+shutil.copy(paths['plain'], paths['compact'])
+engines = {x: sql.create_engine('sqlite+pysqlite:///' + y)
+           for x, y in paths.items()}
+compact.migrate(engines['compact'])
+
+
+# %% Benchmark
+for layout, engine in engines.items():
+    times = timeit.repeat(
+        lambda: dbt.bulk_insert(engine, tabs, ignore=True), number=1, repeat=5)
+    print('{layout:>8}: {mb:6.1f} MB, inserting a season again {t:7.1f} ms '
+          '(best of 5)'.format(layout=layout,
+                               mb=os.path.getsize(paths[layout]) / 2**20,
+                               t=min(times) * 1000))
+    engine.dispose()
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Corpus of recorded pages for offline parser benchmarks (benchmarks/parsers.py)
+# and expected tables parsed from them. Pages are stored in the format of
+# the page cache (scraping.cache) in benchmarks/fixtures/pages, so fetch
+# functions read them with set_cache(..., mode='replay'). CORPUS lists them
+# by kind of page, expected tables are in benchmarks/fixtures/expected.
+# Expected tables are parsed by the original parsers (scraping/polish.py of
+# BASELINE, read from git), so that changes of the parsers are checked
+# against them and not against their own output.
+# The stored corpus is generated by benchmarks.synthetic: players, teams and
+# matches of a season with the old (2008-2019) and the new (2020+) format of
+# statistics, matches with golden sets and not played yet, and player pages
+# redirected to the newest season. Pages of real seasons can be recorded from
+# a page cache instead:
+# python benchmarks/corpus.py [--from-cache cache_dir] [--expected-only]
+
+import argparse
+import gzip
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import types
+import pandas as pd
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import scraping.cache as cache
+import scraping.polish as spl
+import benchmarks.synthetic as syn
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            'fixtures')
+PAGES_DIR = os.path.join(FIXTURES_DIR, 'pages')
+EXPECTED_DIR = os.path.join(FIXTURES_DIR, 'expected')
+CORPUS = os.path.join(FIXTURES_DIR, 'corpus.json')
+
+KINDS = ['players_list', 'teams_list', 'matches_list',
+         'player_info', 'team_info', 'match_info']
+
+# Seasons of the synthetic corpus, with the old and the new statistics
+SEASONS = [2015, 2022]
+
+# Revision with the original parsers, which the expected tables are parsed by
+BASELINE = '3b7812e'
+
+
+# %% Parsers
+def _pairs(entries):
+    return list((x['League'], x['Season']) for x in entries)
+
+
+def _ids(entries, column):
+    rslt = pd.DataFrame(list({'League': x['League'],
+                              'Season': x['Season'],
+                              column: x['ID']} for x in entries),
+                        columns=['League', 'Season', column])
+    return rslt
+
+
+def _parsers(module):
+    """
+    Returns functions parsing all pages of a kind with the fetch functions
+    of a module (scraping.polish or its baseline), each returning a dict
+    of tables.
+    """
+
+    rslt = {
+        'players_list': lambda x: {'players_list': pd.concat(
+            list(module.fetch_players(*y) for y in _pairs(x)),
+            ignore_index=True)},
+        'teams_list': lambda x: {'teams_list': pd.concat(
+            list(module.fetch_teams(*y) for y in _pairs(x)),
+            ignore_index=True)},
+        'matches_list': lambda x: {'matches_list': pd.concat(
+            list(module.fetch_matches(*y) for y in _pairs(x)),
+            ignore_index=True)},
+        'player_info': lambda x: {'players_info':
+                                  module.batch_fetch_player_info(
+                                      _ids(x, 'PlayerID'))},
+        'team_info': lambda x: module.batch_fetch_team_info(
+            _ids(x, 'TeamID')),
+        'match_info': lambda x: module.batch_fetch_match_info(
+            _ids(x, 'MatchID'))}
+    return rslt
+
+
+PARSERS = _parsers(spl)
+
+
+def _baseline_module():
+    """
+    Loads scraping/polish.py of BASELINE as a module whose requests are
+    read from the fixtures (the original make_request always downloads).
+    """
+
+    source = subprocess.run(
+        ['git', 'show', BASELINE + ':scraping/polish.py'],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True).stdout
+
+    rslt = types.ModuleType('baseline_polish')
+    exec(compile(source, 'baseline_polish', 'exec'), rslt.__dict__)
+
+    def make_request(url):
+        req = cache.read(PAGES_DIR, url)
+        req.encoding = 'Latin-2'
+        return req
+
+    rslt.make_request = make_request
+    return rslt
+
+
+def page_url(kind, league, season, ID=None):
+    """
+    Returns a URL of a page as requested by the fetch functions.
+    """
+
+    paths = {'players_list': ['players/tour', season],
+             'teams_list': ['teams/tour', season],
+             'matches_list': ['games/tour', season],
+             'player_info': ['players/tour', season, 'id', ID],
+             'team_info': ['teams/id', ID, 'tour', season],
+             'match_info': ['games/id', ID, 'tour', season]}
+    return spl.url_league(league, *paths[kind])
+
+
+def load_corpus():
+    """
+    Returns a dict of lists of pages ({'League', 'Season', 'ID'}) by kind.
+    """
+
+    with open(CORPUS, 'r') as file:
+        rslt = json.load(file)
+    return rslt
+
+
+def parse(kind, corpus):
+    """
+    Parses all pages of a kind from the corpus (pages are read from
+    the fixtures, not downloaded). Returns a dict of tables.
+    """
+
+    spl.set_cache(PAGES_DIR, mode='replay')
+    try:
+        rslt = PARSERS[kind](corpus[kind])
+    finally:
+        spl.set_cache(None)
+
+    return rslt
+
+
+def expected_path(kind):
+    return os.path.join(EXPECTED_DIR, kind + '.pkl.gz')
+
+
+def read_expected(kind):
+    return pd.read_pickle(expected_path(kind))
+
+
+def _information(tab):
+    # Match information has all columns of scraping.polish.MATCH_INFO_COLUMNS
+    # (empty ones as well) and nullable integers instead of floats
+    rslt = tab.dropna(axis=1, how='all')
+    rslt = rslt.astype({x: float for x in rslt.columns
+                        if rslt[x].dtype.kind in 'iuf'})
+    return rslt
+
+
+# Intended changes of the output against the baseline, both tables are
+# converted before they are compared (with columns in any order)
+CONVERSIONS = {('match_info', 'information'): _information}
+
+
+def check(kind, tabs):
+    """
+    Compares parsed tables with the expected ones, returns a list of
+    differences (empty if they are equal).
+    """
+
+    expected = read_expected(kind)
+    rslt = list()
+    for key in sorted(set(expected) | set(tabs)):
+        if key not in tabs or key not in expected:
+            rslt.append('{kind}: table {key} missing'.format(kind=kind,
+                                                              key=key))
+            continue
+
+        curr, target = tabs[key], expected[key]
+        convert = CONVERSIONS.get((kind, key))
+        if convert is not None:
+            curr, target = convert(curr), convert(target)
+        try:
+            pd.testing.assert_frame_equal(curr, target,
+                                          check_like=convert is not None)
+        except AssertionError as err:
+            rslt.append('{kind}: {key}: {err}'.format(kind=kind, key=key,
+                                                      err=err))
+
+    return rslt
+
+
+# %% Recording
+def _write_page(url, text, final_url=None):
+    req = requests.models.Response()
+    req._content = text.encode()
+    req.url = url if final_url is None else final_url
+    req.status_code = 200
+    req.headers['Content-Type'] = 'text/html; charset=utf-8'
+    cache.write(PAGES_DIR, url, req)
+
+
+def record_synthetic(league='PlusLiga', n_teams=8, n_players=14,
+                     n_matches=24):
+    """
+    Writes synthetic pages of a league in SEASONS into the fixtures.
+    Returns the corpus (see load_corpus).
+    """
+
+    rslt = {x: list() for x in KINDS}
+    for season in SEASONS:
+        base = season * 1000
+        teams = list(range(base + 100, base + 100 + n_teams))
+        players = {x: list(range(x * 100, x * 100 + n_players))
+                   for x in teams}
+        every_player = sum(players.values(), [])
+        matches = list(range(base + 500, base + 500 + n_matches))
+
+        pages = [('players_list', None, syn.players_page(season,
+                                                         every_player)),
+                 ('teams_list', None, syn.teams_page(season, teams)),
+                 ('matches_list', None, syn.matches_page(season, matches))]
+        for team in teams:
+            pages.append(('team_info', team,
+                          syn.team_page(season, team, players[team])))
+            for player in players[team][:4]:
+                pages.append(('player_info', player,
+                              syn.player_page(season, player, team)))
+        for i, match in enumerate(matches):
+            home, away = teams[i % n_teams], teams[(i + 1) % n_teams]
+            pages.append(('match_info', match, syn.match_page(
+                season, match, home, away,
+                players[home][:(n_players - 1)],
+                players[away][:(n_players - 1)],
+                played=i % 8 != 7)))
+
+        for kind, ID, text in pages:
+            _write_page(page_url(kind, league, season, ID), text)
+            entry = {'League': league, 'Season': season}
+            if ID is not None:
+                entry['ID'] = ID
+            rslt[kind].append(entry)
+
+        # Players of other seasons are redirected to the newest one
+        for player in [base + 1, base + 2]:
+            url = page_url('player_info', league, season, player)
+            _write_page(url, syn.player_page(SEASONS[-1], player, teams[0]),
+                        final_url=page_url('player_info', league,
+                                           SEASONS[-1] + 1, player))
+            rslt['player_info'].append({'League': league, 'Season': season,
+                                        'ID': player})
+
+    return rslt
+
+
+def record_cache(cache_dir, n_pages=20):
+    """
+    Copies pages from a page cache (see scraping.cache) into the fixtures:
+    lists, and at most n_pages pages of every other kind of each season,
+    so that a corpus of real pages of the seasons in the cache is recorded.
+    Returns the corpus (see load_corpus).
+    """
+
+    sites = {'plusliga': 'PlusLiga',
+             'tauronliga': 'Tauron Liga',
+             'tauron1liga': 'Tauron 1. Liga'}
+    patterns = {
+        'players_list': r'/players/tour/(?P<season>[0-9]+)\.html',
+        'teams_list': r'/teams/tour/(?P<season>[0-9]+)\.html',
+        'matches_list': r'/games/tour/(?P<season>[0-9]+)\.html',
+        'player_info': r'/players/tour/(?P<season>[0-9]+)/id/(?P<ID>[0-9]+)',
+        'team_info': r'/teams/id/(?P<ID>[0-9]+)/tour/(?P<season>[0-9]+)',
+        'match_info': r'/games/id/(?P<ID>[0-9]+)/tour/(?P<season>[0-9]+)'}
+    patterns = {k: re.compile(r'www\.(?P<site>\w+)\.pl' + v + '$')
+                for k, v in patterns.items()}
+
+    rslt = {x: list() for x in KINDS}
+    counts = dict()
+    for root, _, names in os.walk(cache_dir):
+        for name in sorted(names):
+            if not name.endswith('.gz'):
+                continue
+            path = os.path.join(root, name)
+            with gzip.open(path, 'rb') as file:
+                header = json.loads(file.readline())
+            if header['error'] is not None:
+                continue
+
+            for kind, expr in patterns.items():
+                found = expr.search(header['url'])
+                if found is None:
+                    continue
+
+                entry = {'League': sites[found['site']],
+                         'Season': int(found['season'])}
+                key = (kind, entry['League'], entry['Season'])
+                if kind.endswith('_info'):
+                    entry['ID'] = int(found['ID'])
+                    if counts.get(key, 0) >= n_pages:
+                        break
+                counts[key] = counts.get(key, 0) + 1
+
+                target = cache.cache_path(PAGES_DIR, header['url'])
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copyfile(path, target)
+                rslt[kind].append(entry)
+                break
+
+    return rslt
+
+
+def write_expected(corpus):
+    """
+    Parses the corpus with the baseline parsers (see _baseline_module)
+    and stores the tables as the expected ones.
+    """
+
+    parsers = _parsers(_baseline_module())
+    os.makedirs(EXPECTED_DIR, exist_ok=True)
+    for kind in KINDS:
+        pd.to_pickle(parsers[kind](corpus[kind]), expected_path(kind))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--from-cache', dest='cache_dir',
+                        help='record pages from a page cache instead of '
+                             'generating synthetic ones')
+    parser.add_argument('--expected-only', action='store_true',
+                        help='only parse the stored corpus again with '
+                             'the baseline parsers and replace the expected '
+                             'tables')
+    args = parser.parse_args()
+
+    if args.expected_only:
+        corpus = load_corpus()
+    else:
+        shutil.rmtree(PAGES_DIR, ignore_errors=True)
+        if args.cache_dir is None:
+            corpus = record_synthetic()
+        else:
+            corpus = record_cache(args.cache_dir)
+        with open(CORPUS, 'w') as file:
+            json.dump(corpus, file, indent=1)
+
+    write_expected(corpus)
+    for kind in KINDS:
+        print('{kind:>14}: {n} pages'.format(kind=kind, n=len(corpus[kind])))
+
+
+if __name__ == '__main__':
+    main()
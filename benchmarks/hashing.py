@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Compares hashing schemes of vsutils.add_hash on a synthetic full-season
+# 'matches_stats' table (PlusLiga-sized, ~280 matches with 26 players each)
+# and a 'matches_info' one with missing values of nullable integer columns.
+# Run from the repository root: python benchmarks/hashing.py
+
+import sys
+import os
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import vsutils as vsu
+from benchmarks.synthetic import season_stats, season_info
+
+
+# %% Benchmark
+stats = season_stats()
+tabs = {'matches_stats': stats,
+        'matches_info': season_info(stats)}
+
+differ = False
+for name, tab in tabs.items():
+    print('{name}: rows: {n}, columns: {k}'.format(name=name,
+                                                   n=tab.shape[0],
+                                                   k=tab.shape[1]))
+
+    hashes = dict()
+    for scheme, func in vsu.HASH_SCHEMES.items():
+        hashes[scheme] = func(tab)
+        times = timeit.repeat(lambda: func(tab), number=1, repeat=5)
+        print('{scheme:>10}: {t:8.1f} ms (best of 5)'.format(
+            scheme=scheme, t=min(times) * 1000))
+
+    # Schemes must stay interchangeable, as hashes are parts of primary keys
+    same = all((x == hashes['row']).all() for x in hashes.values())
+    print('Identical hashes: {same}'.format(same=same))
+    differ = differ or not same
+
+if differ:
+    sys.exit(1)
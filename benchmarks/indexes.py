@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Query plans and latencies of typical lookups on a synthetic multi-season
+# database, without and with the secondary indexes from dbtools.schema.
+# Run from the repository root: python benchmarks/indexes.py
+
+import sys
+import os
+import tempfile
+import timeit
+import sqlalchemy as sql
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import vsutils as vsu
+import dbtools as dbt
+from dbtools import schema
+from benchmarks.synthetic import season_stats, season_players, season_results
+
+
+# %% Synthetic database
+leagues = ['PlusLiga', 'Tauron Liga', 'Tauron 1. Liga']
+seasons = range(2008, 2023)
+
+tmp_dir = tempfile.TemporaryDirectory()
+engine = sql.create_engine('sqlite+pysqlite:///' + tmp_dir.name + '/bench.db')
+# Without summary tables, their updates would dominate the load without indexes
+schema.meta.create_all(engine, tables=list(x for x in schema.meta.sorted_tables
+                                           if x not in schema.aggregates))
+for index in schema.indexes:
+    index.drop(engine, checkfirst=True)
+
+for i, league in enumerate(leagues):
+    for season in seasons:
+        stats = season_stats(season=season, seed=season)
+        stats.League = league
+        stats.MatchID += (i * 100 + season - 2000) * 1000
+
+        tabs = {'matches_stats': stats,
+                'players_info': season_players(stats, seed=season),
+                'matches_results': season_results(stats, seed=season)}
+        for tab in tabs.keys():
+            vsu.add_hash(tabs[tab])
+            vsu.add_timestamp(tabs[tab])
+            dbt.insert_new(engine, tab, tabs[tab])
+
+with engine.connect() as db_con:
+    n = db_con.execute(sql.text('SELECT COUNT(*) FROM matches_stats')).scalar()
+print('Rows in matches_stats: {n}'.format(n=n))
+
+
+# %% Queries
+params = {'league': 'PlusLiga', 'season': 2015,
+          'player': int(stats.PlayerID[0]),
+          'team': int(stats.TeamID[0]),
+          'match': int(stats.MatchID[0])}
+
+queries = {
+    'stats by PlayerID': """SELECT * FROM matches_stats
+        WHERE PlayerID = :player""",
+    'stats by team-season': """SELECT * FROM matches_stats
+        WHERE League = :league AND Season = :season AND TeamID = :team""",
+    'results by MatchID': """SELECT * FROM matches_results
+        WHERE MatchID = :match""",
+    'stats join players': """SELECT p.Position, SUM(s.Points)
+        FROM matches_stats AS s
+        JOIN players_info AS p
+            ON p.League = s.League
+            AND p.Season = s.Season
+            AND p.PlayerID = s.PlayerID
+        WHERE s.PlayerID = :player
+        GROUP BY p.Position"""}
+
+
+def run_queries(label):
+    print('\n' + label)
+    with engine.connect() as db_con:
+        for name, query in queries.items():
+            plan = db_con.execute(sql.text('EXPLAIN QUERY PLAN ' + query),
+                                  params).fetchall()
+            times = timeit.repeat(
+                lambda: db_con.execute(sql.text(query), params).fetchall(),
+                number=1, repeat=5)
+            print('{name:>22}: {t:8.2f} ms | {plan}'.format(
+                name=name,
+                t=min(times) * 1000,
+                plan='; '.join(x[-1] for x in plan)))
+
+
+# %% Benchmark
+run_queries('Without secondary indexes')
+dbt.create_indexes(engine)
+run_queries('With secondary indexes')
+
+engine.dispose()
+tmp_dir.cleanup()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# End-to-end throughput against local stand-ins of the leagues' websites
+# (benchmarks/standin.py): fetch_all of every league and season, then the
+# scripts creating the database, backfilling past seasons and refreshing
+# the current one, with a temporary config and data directory. Reports pages
+# served per second, pages not modified, errors and redirects of every phase.
+# python benchmarks/loadtest.py [--latency 0.05] [--jitter 0.02]
+#     [--error-rate 0.01] [--workers 8] [--processes 3] [--seasons 3]
+#     [--no-validators] [--from-cache cache_dir] [--no-scripts]
+
+import argparse
+import json
+import os
+import runpy
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import vsutils as vsu
+import dbtools as dbt
+import scraping.polish as spl
+import benchmarks.standin as sti
+
+SCRIPTS = ['00_create_databases.py',
+           '01_insert_historical_data.py',
+           '02_insert_current_data.py']
+
+
+def _served(sites):
+    rslt = dict()
+    for site in sites.values():
+        for status, n in site.counts.items():
+            rslt[status] = rslt.get(status, 0) + n
+    return rslt
+
+
+def measure(label, sites, func):
+    """
+    Runs func and prints pages served by the sites while it ran, per second.
+    """
+
+    before = _served(sites)
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    after = _served(sites)
+
+    served = {k: v - before.get(k, 0) for k, v in after.items()}
+    pages = served.get(200, 0)
+    print('{label:>32}: {pages:6d} pages in {t:7.2f} s, {pps:7.1f} pages/s '
+          '(not modified: {not_modified}, redirects: {redirects}, '
+          'errors: {errors})'.format(
+              label=label,
+              pages=pages,
+              t=seconds,
+              pps=pages / seconds,
+              not_modified=served.get(304, 0),
+              redirects=served.get(302, 0),
+              errors=served.get(503, 0) + served.get(404, 0)))
+
+
+def _fetch_seasons(seasons, workers):
+    for league in sorted(spl.SITES):
+        for season in seasons:
+            spl.fetch_all(league, season, workers=workers)
+
+
+def _write_config(tmp_dir, seasons, args):
+    with open(os.path.join(ROOT, 'config.json'), 'r') as file:
+        config = json.load(file)
+
+    for key in ['data_dir', 'cache_dir', 'export_dir', 'report_dir']:
+        config['paths'][key] = os.path.join(tmp_dir, key)
+    os.makedirs(config['paths']['data_dir'])
+    config['first_season'] = {x: seasons[0] for x in config['first_season']}
+    config['scraping']['workers'] = args.workers
+    config['backfill']['processes'] = args.processes
+
+    rslt = os.path.join(tmp_dir, 'config.json')
+    with open(rslt, 'w') as file:
+        json.dump(config, file, indent=4)
+    return rslt
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='delay of every response in seconds')
+    parser.add_argument('--jitter', type=float, default=0.02,
+                        help='random additional delay in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='fraction of responses failing with 503')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--processes', type=int, default=3)
+    parser.add_argument('--seasons', type=int, default=3,
+                        help='number of seasons up to the current one')
+    parser.add_argument('--no-validators', dest='validators',
+                        action='store_false',
+                        help='send pages without ETags, as hosts which do '
+                             'not support conditional requests')
+    parser.add_argument('--from-cache', dest='cache_dir',
+                        help='serve pages recorded in a page cache')
+    parser.add_argument('--no-scripts', action='store_true',
+                        help='only fetch, without running the scripts')
+    args = parser.parse_args()
+
+    current = spl.current_season()
+    seasons = list(range(current - args.seasons + 1, current + 1))
+    sites = sti.start_sites(seasons, cache_dir=args.cache_dir,
+                            latency=args.latency,
+                            jitter=args.jitter,
+                            error_rate=args.error_rate,
+                            validators=args.validators)
+    print('Stand-ins: {sites}'.format(
+        sites=', '.join(x.url for x in sites.values())))
+
+    try:
+        measure('fetch_all', sites,
+                lambda: _fetch_seasons(seasons, args.workers))
+        if args.no_scripts:
+            return
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            vsu.set_config_path(_write_config(tmp_dir, seasons, args))
+            dbt.dispose_engines()
+            for script in SCRIPTS:
+                measure(script, sites,
+                        lambda: runpy.run_path(os.path.join(ROOT, script),
+                                               run_name='__main__'))
+            dbt.dispose_engines()
+    finally:
+        for site in sites.values():
+            site.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Offline benchmark of the parsers of scraping.polish on the recorded corpus
+# (benchmarks/corpus.py): pages per second and peak memory of every kind
+# of page, and of the match page table parsers on their own. Parsed tables
+# are checked against the expected ones first, as well as hashes of matches
+# parsed in batches of different sizes, a difference exits with 1.
+# python benchmarks/parsers.py [repeat]
+
+import sys
+import os
+import timeit
+import tracemalloc
+from lxml import html
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pandas as pd
+import vsutils as vsu
+import scraping.cache as cache
+import scraping.polish as spl
+import benchmarks.corpus as crp
+
+
+# %% Corpus
+repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+corpus = crp.load_corpus()
+
+
+def _peak(func):
+    tracemalloc.start()
+    try:
+        func()
+        rslt = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return rslt
+
+
+def _report(label, n, func, unit='pages'):
+    times = timeit.repeat(func, number=1, repeat=repeat)
+    print('{label:>22}: {n:5d} {unit}, {pps:8.1f} {unit}/s, '
+          '{mem:6.1f} MB peak'.format(label=label,
+                                     n=n,
+                                     unit=unit,
+                                     pps=n / min(times),
+                                     mem=_peak(func) / 2**20))
+
+
+# %% Correctness
+differences = list()
+for kind in crp.KINDS:
+    differences.extend(crp.check(kind, crp.parse(kind, corpus)))
+
+
+def _match_hashes(size):
+    """
+    Hashes of match information parsed in batches of a given size.
+    """
+
+    entries = corpus['match_info']
+    spl.set_cache(crp.PAGES_DIR, mode='replay')
+    try:
+        tabs = list(spl.batch_fetch_match_info(
+            crp._ids(entries[start:(start + size)], 'MatchID'))['information']
+            for start in range(0, len(entries), size))
+    finally:
+        spl.set_cache(None)
+
+    # Every batch is hashed on its own, as chunks are when inserted
+    for tab in tabs:
+        vsu.add_hash(tab)
+    rslt = pd.concat(list(x.set_index('MatchID').Hash for x in tabs))
+    return rslt
+
+
+# Hashes are parts of primary keys, a match must get the same one whichever
+# matches are parsed with it (e.g. played ones only, or not played yet)
+hashes = _match_hashes(len(corpus['match_info']))
+for size in [1, 7]:
+    curr = _match_hashes(size)
+    if not curr.equals(hashes):
+        differences.append('match_info: hashes differ in batches of '
+                           '{size}'.format(size=size))
+
+for line in differences:
+    print(line)
+if len(differences) > 0:
+    sys.exit(1)
+print('Parsed tables equal the expected ones')
+
+
+# %% Fetch functions (pages read from the fixtures)
+# Includes reading and decompressing the recorded pages
+for kind in crp.KINDS:
+    _report(kind, len(corpus[kind]),
+            lambda: crp.parse(kind, corpus))
+
+
+# %% Table parsers of match pages
+trees = list()
+for entry in corpus['match_info']:
+    url = crp.page_url('match_info', entry['League'], entry['Season'],
+                       entry['ID'])
+    req = cache.read(crp.PAGES_DIR, url)
+    req.encoding = 'Latin-2'
+    trees.append((entry['Season'], entry['ID'], html.fromstring(req.text)))
+
+stats = list((season, x) for season, _, tree in trees
+             for x in spl.SELECTORS['match_stats'](tree))
+details = list(x for _, _, tree in trees
+               for x in spl.SELECTORS['match_details'](tree))
+results = list(x for _, ID, tree in trees
+               for x in spl.SELECTORS['match_score'](
+                   tree, id='gameScore_' + str(ID)))
+
+_report('_parse_stats_table', len(stats),
+        lambda: list(spl._parse_stats_table(x, season)
+                     for season, x in stats), unit='tables')
+_report('_parse_details_table', len(details),
+        lambda: list(spl._parse_details_table(x) for x in details),
+        unit='tables')
+_report('_parse_results_table', len(results),
+        lambda: list(spl._parse_results_table(x) for x in results),
+        unit='tables')
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Parsing time of match pages with selectors translated from CSS on every call
+# (as element.cssselect does) and with the precompiled scraping.polish
+# SELECTORS. Uses synthetic pages, or match pages saved in the page cache:
+# python benchmarks/parsing.py [cache_dir]
+
+import sys
+import os
+import re
+import gzip
+import json
+import timeit
+from lxml import html, etree
+from lxml.cssselect import CSSSelector
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import scraping.polish as spl
+import benchmarks.synthetic as syn
+
+
+# %% Pages
+def cached_match_pages(cache_dir):
+    """
+    Reads match pages from scraping.cache files, returns a list of
+    (league, season, ID, text).
+    """
+
+    sites = {'plusliga': 'PlusLiga',
+             'tauronliga': 'Tauron Liga',
+             'tauron1liga': 'Tauron 1. Liga'}
+    expr = re.compile(r'www\.(\w+)\.pl/games/id/([0-9]+)/tour/([0-9]+)\.html')
+
+    rslt = list()
+    for root, _, names in os.walk(cache_dir):
+        for name in names:
+            if not name.endswith('.gz'):
+                continue
+            with gzip.open(os.path.join(root, name), 'rb') as file:
+                header = json.loads(file.readline())
+                content = file.read()
+            found = expr.search(header['url'])
+            if found is None or header['error'] is not None:
+                continue
+            rslt.append((sites[found[1]], int(found[3]), int(found[2]),
+                         content.decode(errors='replace')))
+
+    return rslt
+
+
+def synthetic_match_pages(n_matches=100):
+    rslt = list()
+    for season in [2015, 2022]:
+        for i in range(n_matches // 2):
+            ID = 1000 + i
+            text = syn.match_page(season, ID, 1, 2,
+                                  list(range(100, 113)),
+                                  list(range(200, 213)))
+            rslt.append(('PlusLiga', season, ID, text))
+
+    return rslt
+
+
+if len(sys.argv) > 1:
+    pages = cached_match_pages(sys.argv[1])
+else:
+    pages = synthetic_match_pages()
+trees = list((x[0], x[1], x[2], html.fromstring(x[3])) for x in pages)
+print('Match pages: {n}'.format(n=len(trees)))
+
+
+# %% Selectors translated on every call
+class _PerCall:
+    def __init__(self, css):
+        self.css = css
+
+    def __call__(self, element):
+        return CSSSelector(self.css, translator='html')(element)
+
+
+def _score_per_call(element, id):
+    return etree.XPath("descendant-or-self::table[@id = $id]")(element, id=id)
+
+
+compiled = dict(spl.SELECTORS)
+per_call = {name: _PerCall(css) for name, css in spl._selectors_css.items()}
+per_call['match_score'] = _score_per_call
+
+
+# %% Benchmark
+def parse_all():
+    for league, season, ID, tree in trees:
+        spl.parse_match_info(tree, league, season, ID)
+
+
+for label, selectors in [('per call', per_call), ('precompiled', compiled)]:
+    spl.SELECTORS.update(selectors)
+    times = timeit.repeat(parse_all, number=1, repeat=5)
+    print('{label:>12}: {t:8.1f} ms, {pps:7.1f} pages/s (best of 5)'.format(
+        label=label,
+        t=min(times) * 1000,
+        pps=len(trees) / min(times)))
+
+spl.SELECTORS.update(compiled)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Memory and time of reading multi-season 'matches_stats' from a synthetic
+# database with pd.read_sql (default dtypes) and with dbtools.readers
+# (compact dtypes, whole table and in chunks).
+# Run from the repository root: python benchmarks/reading.py
+
+import sys
+import os
+import tempfile
+import timeit
+import pandas as pd
+import sqlalchemy as sql
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import vsutils as vsu
+import dbtools as dbt
+from dbtools import schema
+from dbtools import readers
+from benchmarks.synthetic import season_stats
+
+
+# %% Synthetic database
+leagues = ['PlusLiga', 'Tauron Liga']
+seasons = range(2015, 2023)
+
+tmp_dir = tempfile.TemporaryDirectory()
+engine = sql.create_engine('sqlite+pysqlite:///' + tmp_dir.name + '/bench.db')
+schema.meta.create_all(engine)
+
+for i, league in enumerate(leagues):
+    for season in seasons:
+        stats = season_stats(season=season, seed=season)
+        stats.League = league
+        stats.MatchID += (i * 100 + season - 2000) * 1000
+        vsu.add_hash(stats)
+        vsu.add_timestamp(stats)
+        dbt.insert_new(engine, 'matches_stats', stats)
+
+
+# %% Benchmark
+def read_sql():
+    with engine.connect() as db_con:
+        return pd.read_sql(sql.text('SELECT * FROM matches_stats'), db_con,
+                           parse_dates=['Timestamp'])
+
+
+def read_chunks():
+    return sum(len(x) for x in readers.read_matches_stats(engine,
+                                                          chunk_size=10000))
+
+
+variants = [('read_sql', read_sql),
+            ('readers', lambda: readers.read_matches_stats(engine))]
+for label, func in variants:
+    tab = func()
+    times = timeit.repeat(func, number=1, repeat=3)
+    print('{label:>10}: {t:8.1f} ms, {mb:6.1f} MB, {n} rows'.format(
+        label=label,
+        t=min(times) * 1000,
+        mb=tab.memory_usage(deep=True).sum() / 2**20,
+        n=tab.shape[0]))
+
+times = timeit.repeat(read_chunks, number=1, repeat=3)
+print('{label:>10}: {t:8.1f} ms, 10000 rows at a time'.format(
+    label='chunks', t=min(times) * 1000))
+
+tab = readers.read_matches_stats(engine, leagues='PlusLiga', seasons=[2020],
+                                 columns=['MatchID', 'PlayerID', 'Points'])
+print('Filtered: {n} rows, {k} columns'.format(n=tab.shape[0],
+                                               k=tab.shape[1]))
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Local stand-in for the leagues' websites, serving every URL shape produced
+# by scraping.polish.url_league. Pages are synthetic (benchmarks.synthetic,
+# a deterministic league of a few seasons) or recorded in a page cache
+# (scraping.cache). Responses can be delayed, fail with 503 at a given rate,
+# and player pages of seasons a player did not play in are redirected to
+# the newest season, as on the real websites (broken players redirect
+# in a loop). Pages are sent with ETags and conditional requests of
+# unchanged ones get 304 responses, unless validators are disabled.
+# Used by benchmarks/loadtest.py.
+
+import hashlib
+import http.server
+import random
+import re
+import threading
+import time
+import urllib.parse
+import requests
+
+import benchmarks.synthetic as syn
+import scraping.cache as cache
+import scraping.polish as spl
+
+PATHS = {
+    'players_list': r'/players/tour/(?P<season>[0-9]+)',
+    'player_info': r'/players/tour/(?P<season>[0-9]+)/id/(?P<ID>[0-9]+)',
+    'teams_list': r'/teams/tour/(?P<season>[0-9]+)',
+    'team_info': r'/teams/id/(?P<ID>[0-9]+)/tour/(?P<season>[0-9]+)',
+    'matches_list': r'/games/tour/(?P<season>[0-9]+)',
+    'match_info': r'/games/id/(?P<ID>[0-9]+)/tour/(?P<season>[0-9]+)',
+    'standings': r'/table/tour/(?P<season>[0-9]+)'}
+PATHS = {k: re.compile(v + r'\.html$') for k, v in PATHS.items()}
+
+
+class League:
+    """
+    Synthetic league: seasons with teams, their rosters and matches. Every
+    season's players list has a few players without a roster, whose pages
+    redirect to the newest season, and one broken player redirecting to
+    itself. IDs are derived from seasons, so they never collide.
+    """
+
+    def __init__(self, seasons, n_teams=8, n_players=14, n_matches=None,
+                 n_left=2):
+        self.seasons = sorted(seasons)
+        self.teams = dict()
+        self.rosters = dict()
+        self.matches = dict()
+        self.left = dict()
+        self.broken = set()
+
+        if n_matches is None:
+            n_matches = n_teams * (n_teams - 1)
+        for season in self.seasons:
+            base = season * 1000
+            teams = list(range(base + 100, base + 100 + n_teams))
+            self.teams[season] = teams
+            self.rosters[season] = {
+                x: list(range(x * 100, x * 100 + n_players)) for x in teams}
+            self.matches[season] = {
+                base + 500 + i: (teams[i % n_teams],
+                                 teams[(i + 1 + i // n_teams) % n_teams])
+                for i in range(n_matches)}
+            self.left[season] = list(range(base + 1, base + 1 + n_left))
+            self.broken.add(base + 999)
+
+    def team_of(self, season, ID):
+        for team, players in self.rosters.get(season, dict()).items():
+            if ID in players:
+                return team
+        return None
+
+    def page(self, kind, season, ID):
+        """
+        Returns (status, text or location of a redirect) of a page.
+        """
+
+        if season not in self.teams:
+            return 404, None
+
+        rosters = self.rosters[season]
+        if kind == 'players_list':
+            ids = (sum(rosters.values(), []) + self.left[season] +
+                   [season * 1000 + 999])
+            return 200, syn.players_page(season, ids)
+        if kind == 'teams_list':
+            return 200, syn.teams_page(season, self.teams[season])
+        if kind == 'matches_list':
+            return 200, syn.matches_page(season, list(self.matches[season]))
+        if kind == 'standings':
+            return 200, syn.teams_page(season, self.teams[season])
+        if kind == 'team_info':
+            if ID not in rosters:
+                return 404, None
+            return 200, syn.team_page(season, ID, rosters[ID])
+        if kind == 'match_info':
+            if ID not in self.matches[season]:
+                return 404, None
+            home, away = self.matches[season][ID]
+            # Matches at the end of a season are not played yet
+            played = ID % 1000 < 500 + len(self.matches[season]) * 9 // 10
+            return 200, syn.match_page(season, ID, home, away,
+                                       rosters[home][:-1],
+                                       rosters[away][:-1],
+                                       played=played)
+
+        # Player pages
+        if ID in self.broken:
+            return 302, '/players/tour/{season}/id/{ID}.html'.format(
+                season=season, ID=ID)
+        team = self.team_of(season, ID)
+        if team is not None:
+            return 200, syn.player_page(season, ID, team)
+        newest = self.seasons[-1]
+        if season != newest:
+            return 302, '/players/tour/{season}/id/{ID}.html'.format(
+                season=newest, ID=ID)
+        return 200, syn.player_page(season, ID, self.teams[season][0])
+
+
+class Recorded:
+    """
+    Pages of a league recorded in a page cache, looked up by their path
+    on the real website (spl.SITES before they are replaced).
+    """
+
+    def __init__(self, cache_dir, site):
+        self.cache_dir = cache_dir
+        self.site = site
+
+    def page(self, path):
+        try:
+            req = cache.read(self.cache_dir, self.site + path)
+        except requests.TooManyRedirects:
+            return 302, path
+        if req is None:
+            return 404, None
+        if req.url != self.site + path:
+            return 302, urllib.parse.urlsplit(req.url).path
+        return 200, req.content
+
+
+def _encode(content):
+    return content if isinstance(content, bytes) else content.encode()
+
+
+def _etag(body):
+    return '"{hash}"'.format(hash=hashlib.md5(body).hexdigest())
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        site = self.server.site
+        status, content = site.respond(self.path,
+                                       self.headers.get('If-None-Match'))
+
+        body = b''
+        if status == 200:
+            body = _encode(content)
+        self.send_response(status)
+        if status == 302:
+            self.send_header('Location', content)
+        if status in [200, 304] and site.validators:
+            self.send_header('ETag', content if status == 304
+                             else _etag(body))
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class Site:
+    """
+    Stand-in for a website of a league, serving pages of a League
+    (synthetic) or of a Recorded one. Every response is delayed by latency
+    plus a uniformly random jitter (seconds), error_rate of them are 503
+    errors. With validators, pages are sent with ETags and requests with
+    an ETag of the current page get 304 responses (not modified). Counts
+    of responses by status are kept in counts.
+    """
+
+    def __init__(self, pages, latency=0.0, jitter=0.0, error_rate=0.0,
+                 validators=True, seed=0):
+        self.pages = pages
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.validators = validators
+        self.counts = dict()
+        self.bytes = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+
+    def _count(self, status, n):
+        with self._lock:
+            self.counts[status] = self.counts.get(status, 0) + 1
+            self.bytes += n
+
+    def respond(self, path, etag=None):
+        """
+        Returns (status, content) of a path, the content is a page,
+        a location of a redirect, or an ETag of a page which is the same
+        as the one with the given ETag (304, not modified).
+        """
+
+        with self._lock:
+            delay = self.latency + self.jitter * self._random.random()
+            error = self._random.random() < self.error_rate
+        if delay > 0:
+            time.sleep(delay)
+        if error:
+            self._count(503, 0)
+            return 503, None
+
+        if isinstance(self.pages, Recorded):
+            status, content = self.pages.page(path)
+        else:
+            status, content = 404, None
+            for kind, expr in PATHS.items():
+                found = expr.fullmatch(path)
+                if found is None:
+                    continue
+                ID = found.groupdict().get('ID')
+                status, content = self.pages.page(
+                    kind, int(found['season']),
+                    None if ID is None else int(ID))
+                break
+
+        if status == 200 and self.validators and etag is not None:
+            if _etag(_encode(content)) == etag:
+                status, content = 304, etag
+
+        self._count(status, len(content) if status == 200 else 0)
+        return status, content
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return 'http://{host}:{port}'.format(host=host, port=port)
+
+    def start(self, port=0):
+        self._server = http.server.ThreadingHTTPServer(('127.0.0.1', port),
+                                                       _Handler)
+        self._server.daemon_threads = True
+        self._server.site = self
+        threading.Thread(target=self._server.serve_forever,
+                         daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def start_sites(seasons, cache_dir=None, **kwargs):
+    """
+    Starts a stand-in Site for every league of spl.SITES (each on its own
+    port, so limits per host apply as to the real ones) and points
+    spl.SITES to them. Pages are synthetic, or recorded in cache_dir.
+    Other arguments are passed to Site. Returns a dict of sites.
+    """
+
+    rslt = dict()
+    for i, (league, url) in enumerate(sorted(spl.SITES.items())):
+        if cache_dir is None:
+            pages = League(seasons)
+        else:
+            pages = Recorded(cache_dir, url)
+        rslt[league] = Site(pages, seed=i, **kwargs).start()
+
+    for league, site in rslt.items():
+        spl.SITES[league] = site.url
+    return rslt
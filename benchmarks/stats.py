@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Loading and aggregating a synthetic full-history 'matches_stats' table
+# (3 leagues, 2008-2022, old and new formats) with stats.tables.
+# Totals are checked against a plain Python loop over rows.
+# Run from the repository root: python benchmarks/stats.py
+
+import sys
+import os
+import tempfile
+import timeit
+import numpy as np
+import sqlalchemy as sql
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import vsutils as vsu
+import dbtools as dbt
+from dbtools import schema
+from stats import tables
+from benchmarks.synthetic import season_stats
+
+
+# %% Synthetic database
+leagues = ['PlusLiga', 'Tauron Liga', 'Tauron 1. Liga']
+seasons = range(2008, 2023)
+
+tmp_dir = tempfile.TemporaryDirectory()
+engine = sql.create_engine('sqlite+pysqlite:///' + tmp_dir.name + '/bench.db')
+schema.meta.create_all(engine)
+
+for i, league in enumerate(leagues):
+    for season in seasons:
+        stats = season_stats(season=season, seed=season)
+        stats.League = league
+        stats.MatchID += (i * 100 + season - 2000) * 1000
+        if season <= 2019:
+            # Old format
+            stats = stats.astype({'BreakPoints': object,
+                                  'PointsRatio': object,
+                                  'ServeSlashes': object,
+                                  'BlockAssists': object})
+            stats[['BreakPoints', 'PointsRatio',
+                   'ServeSlashes', 'BlockAssists']] = None
+            stats['ReceptionNegative'] = np.int32(1)
+
+        vsu.add_hash(stats)
+        vsu.add_timestamp(stats)
+        dbt.insert_new(engine, 'matches_stats', stats)
+
+
+# %% Benchmark
+times = timeit.repeat(lambda: tables.load_stats(engine), number=1, repeat=3)
+tab = tables.load_stats(engine)
+print('Rows: {n}, memory: {mb:.1f} MB'.format(
+    n=tab.shape[0], mb=tab.memory_usage(deep=True).sum() / 2**20))
+print('{label:>10}: {t:8.1f} ms (best of 3)'.format(label='load',
+                                                    t=min(times) * 1000))
+
+rslt = dict()
+for level in tables.LEVELS:
+    rslt[level] = tables.league_table(tab, level=level)
+    times = timeit.repeat(lambda: tables.league_table(tab, level=level),
+                          number=1, repeat=5)
+    print('{label:>10}: {t:8.1f} ms, {n:6d} rows (best of 5)'.format(
+        label=level, t=min(times) * 1000, n=rslt[level].shape[0]))
+
+
+# %% Check
+expected = dict()
+matches = dict()
+for row in tab.itertuples():
+    key = (row.League, row.Season, row.TeamID)
+    curr = expected.setdefault(key, {'Points': 0, 'SetsPlayed': set()})
+    curr['Points'] += row.Points
+    curr_season = matches.setdefault((row.League, row.Season),
+                                     {'Matches': set(), 'SetsPlayed': set()})
+    curr_season['Matches'].add(row.MatchID)
+    for i, col in enumerate(tables.SET_COLUMNS):
+        if getattr(row, col):
+            curr['SetsPlayed'].add((row.MatchID, i))
+            curr_season['SetsPlayed'].add((row.MatchID, i))
+
+team = rslt['team'].set_index(['League', 'Season', 'TeamID'])
+same = all(team.Points[key] == x['Points'] and
+           team.SetsPlayed[key] == len(x['SetsPlayed'])
+           for key, x in expected.items())
+# Every match of a season is counted once, not once for each team
+season = rslt['season'].set_index(['League', 'Season'])
+same = same and all(season.Matches[key] == len(x['Matches']) and
+                    season.SetsPlayed[key] == len(x['SetsPlayed'])
+                    for key, x in matches.items())
+old = rslt['season'].Season <= 2019
+formats = (rslt['season'].BlockInvolvementSet[old].isna().all() and
+           rslt['season'].BlockInvolvementSet[~old].notna().all() and
+           rslt['season'].BlocksSet.notna().all())
+print('Totals match a loop: {same}, formats consistent: {formats}'.format(
+    same=same, formats=formats))
+if not (same and formats):
+    sys.exit(1)
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Synthetic tables shaped like the ones produced by scraping.polish,
+# used by the benchmarks
+
+import numpy as np
+import pandas as pd
+
+
+def season_stats(n_matches=280, n_players=26, season=2022, seed=0):
+    rng = np.random.default_rng(seed)
+    n = n_matches * n_players
+
+    rslt = pd.DataFrame({
+        'League': 'PlusLiga',
+        'Season': np.int32(season),
+        'MatchID': np.repeat(np.arange(n_matches, dtype=np.int64) + 1100000,
+                             n_players),
+        'TeamID': rng.integers(30000, 30016, n).astype(np.int64),
+        'PlayerID': rng.integers(1, 40000, n).astype(np.int64)})
+
+    for col in ['SetI', 'SetII', 'SetIII', 'SetIV', 'SetV']:
+        rslt[col] = rng.choice(np.array(['1', '2', '*', None], dtype=object), n)
+
+    int_cols = ['Points', 'BreakPoints', 'PointsRatio',
+                'ServeTotal', 'ServeErrors', 'ServeAces', 'ServeSlashes',
+                'ReceptionTotal', 'ReceptionErrors', 'ReceptionPositive',
+                'ReceptionPerfect', 'AttackTotal', 'AttackErrors',
+                'AttackBlocked', 'AttackKills', 'BlockPoints', 'BlockAssists']
+    for col in int_cols:
+        rslt[col] = rng.integers(0, 30, n).astype(np.int32)
+
+    return rslt
+
+
+def season_players(stats, seed=0):
+    rng = np.random.default_rng(seed)
+    rslt = stats[['League', 'Season', 'PlayerID', 'TeamID']]
+    rslt = rslt.drop_duplicates('PlayerID').reset_index(drop=True)
+    n = rslt.shape[0]
+
+    rslt.insert(loc=3, column='PlayerName',
+                value=list('Player {i}'.format(i=i) for i in rslt.PlayerID))
+    rslt['DateOfBirth'] = pd.to_datetime('1990-01-01')
+    rslt['Position'] = rng.choice(['OH', 'RSH', 'MBH', 'Libero', 'Setter'], n)
+    for col, low, high in [('Height', 175, 215),
+                           ('Weight', 65, 110),
+                           ('Reach', 300, 370)]:
+        rslt[col] = rng.integers(low, high, n).astype(np.float32)
+
+    return rslt
+
+
+def season_results(stats, seed=0):
+    rng = np.random.default_rng(seed)
+    rslt = stats[['League', 'Season', 'MatchID']].drop_duplicates()
+    rslt = rslt.loc[rslt.index.repeat(4)].reset_index(drop=True)
+    n = rslt.shape[0]
+
+    rslt['Set'] = np.tile(np.arange(1, 5), n // 4)
+    rslt['Time'] = '0:25'
+    rslt['Points'] = list('25:{x}'.format(x=x) for x in rng.integers(10, 24, n))
+    rslt['Result'] = '1:0'
+    return rslt
+
+
+def season_info(stats, seed=0):
+    """
+    Information about matches of stats, with missing MVPs, spectators and
+    arena sizes (nullable integers), as for matches not played yet.
+    """
+
+    rng = np.random.default_rng(seed)
+    rslt = stats[['League', 'Season', 'MatchID']].drop_duplicates()
+    rslt = rslt.reset_index(drop=True)
+    n = rslt.shape[0]
+
+    rslt['Home'] = rng.integers(30000, 30016, n).astype(np.int64)
+    rslt['Away'] = rng.integers(30000, 30016, n).astype(np.int64)
+    rslt['Date'] = pd.Timestamp('2022-10-01') + pd.to_timedelta(
+        np.arange(n) // 4, unit='D')
+    rslt['Arena'] = 'Arena'
+    for col, dtype, high in [('MVP', 'Int64', 40000),
+                             ('Spectators', 'Int32', 10000),
+                             ('ArenaSize', 'Int32', 10000)]:
+        values = pd.array(rng.integers(1, high, n), dtype=dtype)
+        values[rng.random(n) < 0.2] = pd.NA
+        rslt[col] = values
+
+    return rslt
+
+
+# %% Synthetic pages
+# HTML pages with the structure read by scraping.polish selectors,
+# values are random but reproducible for given IDs
+STATS_COLS_OLD = ['Points',
+                  'ServeTotal', 'ServeAces', 'ServeErrors', 'AcesSet',
+                  'ReceptionTotal', 'ReceptionErrors', 'ReceptionNegative',
+                  'ReceptionPositive', 'ReceptionPosPerc',
+                  'ReceptionPerfect', 'ReceptionPerfPerc',
+                  'AttackTotal', 'AttackErrors', 'AttackBlocked',
+                  'AttackKills', 'AttackKillPerc',
+                  'BlockPoints', 'BlocksSet']
+STATS_COLS_NEW = ['Points', 'BreakPoints', 'PointsRatio',
+                  'ServeTotal', 'ServeErrors', 'ServeAces', 'ServeEff',
+                  'ReceptionTotal', 'ReceptionErrors',
+                  'ReceptionPosPerc', 'ReceptionPerfPerc',
+                  'AttackTotal', 'AttackErrors', 'AttackBlocked',
+                  'AttackKills', 'AttackKillPerc', 'AttackEff',
+                  'BlockPoints', 'BlockAssists']
+
+
+def _page(body):
+    return '<html><body>' + body + '</body></html>'
+
+
+def players_page(season, ids):
+    link = ('<div class="caption"><h3>'
+            '<a href="/players/id/{ID}/tour/{season}.html">Player</a>'
+            '</h3></div>')
+    return _page(''.join(link.format(ID=x, season=season) for x in ids))
+
+
+def player_page(season, ID, team):
+    rng = np.random.default_rng(ID)
+    position = rng.choice(['Przyjmujący', 'Atakujący', 'Środkowy',
+                           'Libero', 'Rozgrywający'])
+    # Reach is missing for liberos, as on the website
+    reach = '' if position == 'Libero' else str(rng.integers(320, 360))
+    metrics = ['',
+               '{d:02d}.{m:02d}.{y}'.format(d=rng.integers(1, 29),
+                                            m=rng.integers(1, 13),
+                                            y=rng.integers(1980, 2004)),
+               position,
+               str(rng.integers(180, 215)),
+               str(rng.integers(70, 110)),
+               reach]
+
+    body = ('<div class="pagecontent"><div><div>{metrics}</div></div></div>'
+            '<div class="playerteamname">'
+            '<a href="/teams/id/{team}/tour/{season}.html">Team</a></div>'
+            '<h1 class="playername">Player {ID}</h1>')
+    return _page(body.format(
+        metrics=''.join('<span>' + x + '</span>' for x in metrics),
+        team=team,
+        season=season,
+        ID=ID))
+
+
+def teams_page(season, ids):
+    link = ('<div class="thumbnail teamlist">'
+            '<a href="/teams/id/{ID}/tour/{season}.html">Team</a></div>')
+    return _page(''.join(link.format(ID=x, season=season) for x in ids))
+
+
+def team_page(season, ID, players):
+    link = ('<div class="player-item to-filter cut-paste">'
+            '<a href="/players/id/{ID}/tour/{season}.html">Player</a></div>')
+    body = ('<div class="col-sm-12"><div class="pagecontent">'
+            '<div class="row">Team information</div></div></div>'
+            '<div><h1>Team {ID}</h1></div>').format(ID=ID)
+    body += ''.join(link.format(ID=x, season=season) for x in players)
+    return _page(body)
+
+
+def matches_page(season, ids):
+    link = ('<div class="gameresult clickable" onclick="window.location='
+            '\'/games/id/{ID}/tour/{season}.html\'">Match</div>')
+    return _page(''.join(link.format(ID=x, season=season) for x in ids))
+
+
+def _stats_table(rng, season, players, golden):
+    sets = ['I', 'II', 'III', 'IV', 'V'] + (['GS'] if golden else [])
+    cols = STATS_COLS_OLD if season <= 2019 else STATS_COLS_NEW
+
+    head = ('<thead><tr><th>Sets</th><th>Statistics</th></tr><tr>' +
+            ''.join('<th>' + x + '</th>' for x in sets + cols) +
+            '</tr></thead>')
+
+    rows = list()
+    for player in players:
+        values = list(rng.choice(['1', '*', '']) for _ in sets)
+        for col in cols:
+            if col.endswith('Perc') or col.endswith('Eff'):
+                values.append(rng.choice(['', str(rng.integers(0, 101))]) + '%')
+            else:
+                values.append(str(rng.integers(0, 21)))
+
+        rows.append('<tr><th class="min-responsive">'
+                    '<a href="/players/id/{ID}/tour/{season}.html">Player</a>'
+                    '</th>'.format(ID=player, season=season) +
+                    ''.join('<td>' + x + '</td>' for x in values) +
+                    '</tr>')
+    # Totals row, skipped by the parser
+    rows.append('<tr><th>Total</th></tr>')
+
+    return ('<table class="rs-standings-table">' + head +
+            '<tbody>' + ''.join(rows) + '</tbody></table>')
+
+
+def match_page(season, ID, home, away, home_players, away_players,
+               played=True):
+    rng = np.random.default_rng(ID)
+    team = ('<div class="col-xs-4 col-sm-3 tablecell"><h2>'
+            '<a href="/teams/id/{ID}/tour/{season}.html">Team</a>'
+            '</h2></div>')
+    row = '<tr><td>{label}:</td><td><span>{value}</span></td></tr>'
+
+    body = (team.format(ID=home, season=season) +
+            team.format(ID=away, season=season))
+    body += ('<div class="col-xs-4 col-sm-2 tablecell">'
+             '<div class="date khanded"> {d:02d}.10.{y}, 17:30 </div>'
+             '</div>').format(d=rng.integers(1, 29), y=season)
+
+    mvp = '<a href="/players/id/{ID}/tour/{season}.html">Player</a>'.format(
+        ID=home_players[0], season=season)
+    details = [('Faza', 'zasadnicza'),
+               ('Termin', rng.integers(1, 31)),
+               ('MVP', mvp),
+               ('Liczba widzów', rng.integers(100, 5000)),
+               ('Sędzia pierwszy', 'Referee A'),
+               ('Sędzia drugi', 'Referee B')]
+    # Matches not played yet have neither MVPs nor spectators
+    if not played:
+        details = list(x for x in details
+                       if x[0] not in ['MVP', 'Liczba widzów'])
+    place = [('Nazwa', 'Arena'),
+             ('Miasto', 'City'),
+             ('Liczba miejsc siedzących w hali', rng.integers(1000, 9000))]
+    body += ('<div class="col-sm-6 col-md-5"><table>' +
+             ''.join(row.format(label=x, value=y) for x, y in details) +
+             '</table></div>')
+    body += ('<div class="pagecontent"><table class="right-left spacced">' +
+             ''.join(row.format(label=x, value=y) for x, y in place) +
+             '</table></div>')
+
+    if played:
+        golden = rng.random() < 0.2
+        body += _stats_table(rng, season, home_players, golden)
+        body += _stats_table(rng, season, away_players, golden)
+
+        score = ['<tr><td>Set</td><td>Czas</td><td>Punkty</td>'
+                 '<td>Wynik</td></tr>']
+        n_sets = rng.integers(3, 6)
+        for i in range(n_sets):
+            score.append('<tr><td>{i}</td><td>0:2{i}</td><td>25:{p}</td>'
+                         '<td>{i}:0</td></tr>'.format(i=i + 1,
+                                                      p=rng.integers(10, 24)))
+        score.append('<tr><td>Łącznie</td><td>1:40</td><td>75:60</td>'
+                     '<td>3:0</td></tr>')
+        body += '<table id="gameScore_{ID}">{rows}</table>'.format(
+            ID=ID, rows=''.join(score))
+
+    return _page(body)
@@ -3,22 +3,415 @@
 
 import sqlalchemy as sql
 import vsutils as vsu
+import vsutils.metrics as metrics
+from dbtools import schema
+from dbtools import aggregates
+from dbtools import compact
 import os
+import threading
+import datetime as dttm
+
+# Engines by database name, shared by all callers of get_engine
+_engines = dict()
+_engines_lock = threading.Lock()
+
+# Functions called with every new DBAPI connection of these engines
+_connect_hooks = list()
 
 def get_db_path(db_name):
     config = vsu.get_config()
 
-    db_path = '{dir}/{name}'.format(
-        dir=config['paths']['data_dir'],
-        name=config['paths']['db_names'][db_name])
+    db_path = os.path.join(
+        vsu.resolve_path(config['paths']['data_dir']),
+        config['paths']['db_names'][db_name])
     return db_path
 
+def _records(tab):
+    """
+    Converts a pd.DataFrame into a list of dicts with Python values,
+    missing values replaced by None, ready to be bound as parameters.
+    """
+
+    rslt = tab.astype(object).where(tab.notna(), None)
+    rslt = rslt.to_dict('records')
+    return rslt
+
+
+def _on_connect(dbapi_con, con_record):
+    for hook in _connect_hooks:
+        hook(dbapi_con, con_record)
+
+
+def add_connect_hook(hook):
+    """
+    Registers a function called as hook(dbapi_con, con_record) with every
+    new connection of engines from get_engine, e.g. to set PRAGMAs or
+    register SQL functions. Applies to engines already created as well,
+    but only to their connections opened afterwards.
+    """
+
+    with _engines_lock:
+        if hook not in _connect_hooks:
+            _connect_hooks.append(hook)
+
+
 def get_engine(db_name, echo=False, clean=False):
-    db_path = get_db_path(db_name)
-    sqlite_path = 'sqlite+pysqlite:///' + db_path
+    """
+    Returns the engine of a database, created once per process and shared,
+    so its pool keeps connections (and their page caches) between calls.
+    With clean, the database file is removed and a new engine is created.
+    """
 
-    if clean and os.path.exists(db_path):
-        os.remove(db_path)
+    with _engines_lock:
+        engine = _engines.get(db_name)
+        if engine is not None and not clean:
+            engine.echo = echo
+            return engine
+
+        if engine is not None:
+            engine.dispose()
+        db_path = get_db_path(db_name)
+        if clean and os.path.exists(db_path):
+            os.remove(db_path)
+
+        engine = sql.create_engine('sqlite+pysqlite:///' + db_path, echo=echo)
+        sql.event.listen(engine, 'connect', _on_connect)
+        _engines[db_name] = engine
 
-    engine = sql.create_engine(sqlite_path, echo=echo)
     return engine
+
+
+def dispose_engines():
+    """
+    Closes connections of all engines and forgets them, e.g. after the
+    configuration is reloaded with a different database path.
+    """
+
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
+def create_indexes(engine):
+    """
+    Creates secondary indexes declared in dbtools.schema which are missing
+    in a database, e.g. one created before they were declared. Indexes
+    of missing tables are skipped (summary tables get theirs when created,
+    see dbtools.aggregates.create).
+    """
+
+    tables = sql.inspect(engine).get_table_names()
+    for index in schema.indexes:
+        if index.table.name in tables:
+            index.create(engine, checkfirst=True)
+
+
+def create_caches(engine):
+    """
+    Creates tables of dbtools.schema.caches (players_skipped, see
+    get_skipped_ids, pages_fingerprints, see get_fingerprints, and
+    pages_validators, see get_validators) which are missing, e.g. in
+    a database created before they were declared.
+    """
+
+    schema.meta.create_all(engine, tables=schema.caches)
+
+
+def get_skipped_ids(engine, league, season, ttl_days=None):
+    """
+    Returns a set of IDs of players whose pages of a given league and season
+    were redirected (see scraping.polish.iter_fetch_all) within the last
+    ttl_days (by default cache.skipped_ttl_days of the config), so they
+    do not have to be requested again. Empty if the table does not exist.
+    """
+
+    if ttl_days is None:
+        ttl_days = vsu.get_config()['cache']['skipped_ttl_days']
+    since = dttm.datetime.today() - dttm.timedelta(days=ttl_days)
+
+    query = """SELECT DISTINCT PlayerID
+    FROM players_skipped
+    WHERE League = :league
+        AND Season = :season
+        AND Timestamp >= :since"""
+    params = {'league': league,
+              'season': int(season),
+              'since': since.isoformat(sep=' ')}
+
+    with engine.connect() as db_con:
+        if not sql.inspect(db_con).has_table(schema.p_skipped.name):
+            return set()
+        ids = db_con.execute(sql.text(query), params).fetchall()
+
+    rslt = set(x[0] for x in ids)
+    return rslt
+
+
+def get_fingerprints(engine, league, season):
+    """
+    Returns a dict of URLs of pages of a given league and season to their
+    latest stored fingerprints (see scraping.polish.iter_fetch_all), which
+    include the version of the parsers.
+    Empty if the table does not exist.
+    """
+
+    query = """SELECT URL, Fingerprint
+    FROM (SELECT URL, Fingerprint,
+              ROW_NUMBER() OVER (PARTITION BY URL
+                                 ORDER BY Timestamp DESC) AS n
+          FROM pages_fingerprints
+          WHERE League = :league
+              AND Season = :season)
+    WHERE n = 1"""
+    params = {'league': league,
+              'season': int(season)}
+
+    with engine.connect() as db_con:
+        if not sql.inspect(db_con).has_table(schema.pg_fingerprints.name):
+            return dict()
+        rslt = dict(db_con.execute(sql.text(query), params).fetchall())
+
+    return rslt
+
+
+def get_validators(engine, league, season, parser_version):
+    """
+    Returns a dict of URLs of pages of a given league and season to their
+    latest stored (ETag, Last-Modified) pairs (see
+    scraping.polish.make_request), if they were stored by the given version
+    of the parsers (scraping.polish.PARSER_VERSION). Pages parsed by another
+    version are left out, so they are downloaded and parsed again.
+    Empty if the table does not exist.
+    """
+
+    query = """SELECT URL, ETag, LastModified
+    FROM (SELECT URL, ETag, LastModified, ParserVersion,
+              ROW_NUMBER() OVER (PARTITION BY URL
+                                 ORDER BY Timestamp DESC) AS n
+          FROM pages_validators
+          WHERE League = :league
+              AND Season = :season)
+    WHERE n = 1
+        AND ParserVersion = :version"""
+    params = {'league': league,
+              'season': int(season),
+              'version': int(parser_version)}
+
+    with engine.connect() as db_con:
+        if not sql.inspect(db_con).has_table(schema.pg_validators.name):
+            return dict()
+        rows = db_con.execute(sql.text(query), params).fetchall()
+
+    rslt = {x[0]: (x[1], x[2]) for x in rows}
+    return rslt
+
+
+def get_complete_ids(engine, league, season, closed=True):
+    """
+    Finds IDs whose pages do not have to be fetched again in an incremental
+    refresh of a given league and season (see scraping.polish.fetch_all):
+    matches played before today with both results and stats in the database,
+    teams and players with their information already stored, and players
+    whose pages were recently redirected (see get_skipped_ids).
+    Rosters and players' information change during a season, so unless it
+    is closed, stored teams and players are fetched again (only matches and
+    redirected players are skipped), their unchanged pages are not parsed
+    (see get_fingerprints and get_validators). Also gives 'StatsPlayerID',
+    players of the stored statistics, whose matches are not parsed again
+    when they are skipped or unchanged, but which still extend the players
+    list.
+    """
+
+    # Tables are filtered directly, in a compact database by the ID of
+    # the league (see dbtools.compact.league_tables)
+    match_query = """SELECT DISTINCT i.MatchID
+    FROM {matches_info} AS i
+    WHERE i.League = :league
+        AND i.Season = :season
+        AND i.Date < :today
+        AND EXISTS (SELECT 1 FROM {matches_results} AS r
+                    WHERE r.League = i.League
+                        AND r.Season = i.Season
+                        AND r.MatchID = i.MatchID)
+        AND EXISTS (SELECT 1 FROM {matches_stats} AS s
+                    WHERE s.League = i.League
+                        AND s.Season = i.Season
+                        AND s.MatchID = i.MatchID)"""
+    id_query = """SELECT DISTINCT {column}
+    FROM {tab}
+    WHERE League = :league
+        AND Season = :season"""
+
+    params = {'season': int(season),
+              'today': dttm.date.today().isoformat()}
+
+    rslt = dict()
+    with engine.connect() as db_con:
+        tables, params['league'] = compact.league_tables(db_con, league)
+        curr_query = match_query.format(**tables)
+        ids = db_con.execute(sql.text(curr_query), params).fetchall()
+        rslt['MatchID'] = set(x[0] for x in ids)
+
+        curr_query = id_query.format(column='PlayerID',
+                                     tab=tables['matches_stats'])
+        ids = db_con.execute(sql.text(curr_query), params).fetchall()
+        rslt['StatsPlayerID'] = set(x[0] for x in ids)
+
+        for column, tab in [('TeamID', 'teams_info'),
+                            ('PlayerID', 'players_info')]:
+            rslt[column] = set()
+            if not closed:
+                continue
+
+            curr_query = id_query.format(column=column, tab=tables[tab])
+            ids = db_con.execute(sql.text(curr_query), params).fetchall()
+            rslt[column] = set(x[0] for x in ids)
+
+    rslt['PlayerID'] |= get_skipped_ids(engine, league, season)
+    return rslt
+
+
+def _insert(db_con, tab_name, tab, ignore=False):
+    """
+    Inserts a pd.DataFrame into a table with a single parameterized
+    statement executed for all rows. With ignore, rows with primary keys
+    already present are skipped (INSERT OR IGNORE). In a compact database
+    (see dbtools.compact), rows are encoded and inserted into its tables,
+    whose primary keys include the binary hashes.
+    Recorded as 'insert.{tab_name}' metrics with all given rows.
+    Returns the number of inserted rows.
+    """
+
+    if len(tab) == 0:
+        return 0
+
+    with metrics.timer('insert.' + tab_name) as counts:
+        counts['rows'] = len(tab)
+        rslt = _insert_rows(db_con, tab_name, tab, ignore)
+    return rslt
+
+
+def _insert_rows(db_con, tab_name, tab, ignore):
+    if tab_name in compact.tables and compact.is_compact(db_con):
+        table = compact.tables[tab_name]
+        tab = compact.encode(db_con, tab)
+    else:
+        table = sql.Table(tab_name, sql.MetaData(), autoload_with=db_con)
+    statement = sql.insert(table)
+    if ignore:
+        statement = statement.prefix_with('OR IGNORE')
+
+    rslt = db_con.execute(statement, _records(tab)).rowcount
+    return rslt
+
+
+def insert_new(engine, tab_name, tab):
+    """
+    Inserts rows of a pd.DataFrame which are not yet in a table. Duplicates
+    are skipped by SQLite on the primary key (which includes Hash) with a
+    single parameterized INSERT OR IGNORE statement. Summary tables are
+    updated in the same transaction (see dbtools.aggregates).
+    Returns the number of inserted rows.
+    """
+
+    with engine.begin() as db_con:
+        rslt = _insert(db_con, tab_name, tab, ignore=True)
+        if rslt > 0:
+            aggregates.update(db_con, {tab_name: tab})
+
+    return rslt
+
+
+def update_hashes(engine, tab_name, tab):
+    """
+    Replaces hashes of stored rows, e.g. after a change of how rows are
+    hashed. A pd.DataFrame gives the primary keys of the rows (with their
+    current Hash) and their new hashes in NewHash. Rows whose new hash is
+    already stored are duplicates and are deleted. Runs in a single
+    transaction, in a compact database (see dbtools.compact) on its tables.
+    Returns the number of updated rows.
+    """
+
+    if len(tab) == 0:
+        return 0
+
+    with engine.begin() as db_con:
+        if tab_name in compact.tables and compact.is_compact(db_con):
+            tab = compact.encode(db_con, tab)
+            tab['NewHash'] = tab['NewHash'].map(bytes.fromhex)
+            tab_name = compact.tables[tab_name].name
+
+        keys = ' AND '.join('"{col}" = :{col}'.format(col=x)
+                            for x in tab.columns if x != 'NewHash')
+        records = _records(tab)
+        rslt = db_con.execute(
+            sql.text('UPDATE OR IGNORE {tab} SET Hash = :NewHash '
+                     'WHERE {keys}'.format(tab=tab_name, keys=keys)),
+            records).rowcount
+        db_con.execute(
+            sql.text('DELETE FROM {tab} WHERE {keys}'.format(tab=tab_name,
+                                                           keys=keys)),
+            records)
+
+    return rslt
+
+
+# Pragmas speeding up large loads at the cost of durability during the load:
+# a crash while they are set can corrupt the database. Only for a single
+# load which is simply repeated after a failure (e.g. into a new database),
+# chunked and resumable loads (pipeline.backfill, pipeline.insert_chunks)
+# keep the defaults, so that chunks inserted before a crash stay intact.
+# cache_size is negative, i.e. in KiB
+BULK_PRAGMAS = {'journal_mode': 'MEMORY',
+                'synchronous': 'OFF',
+                'cache_size': -256000}
+
+
+def _set_pragmas(db_con, pragmas):
+    """
+    Sets SQLite pragmas on a connection (outside of a transaction).
+    Returns their previous values.
+    """
+
+    rslt = dict()
+    for name, value in pragmas.items():
+        rslt[name] = db_con.exec_driver_sql('PRAGMA ' + name).scalar()
+        db_con.exec_driver_sql('PRAGMA {name} = {value}'.format(name=name,
+                                                               value=value))
+    db_con.commit()
+
+    return rslt
+
+
+def bulk_insert(engine, tabs, ignore=False, pragmas=None):
+    """
+    Inserts a dict of pd.DataFrames (e.g. from scraping.polish.fetch_all)
+    into tables named by its keys in a single transaction, so either all
+    of them are inserted or none. Each table is written by one executemany.
+    With ignore, rows already present are skipped (see insert_new).
+    Summary tables are updated in the same transaction for groups with
+    inserted rows (see dbtools.aggregates). Pragmas (e.g. BULK_PRAGMAS for
+    a one-shot load) are set for the load and restored afterwards. The whole transaction
+    (including its commit) is recorded as 'insert.transaction' metrics.
+    Returns a dict with numbers of inserted rows.
+    """
+
+    if pragmas is None:
+        pragmas = dict()
+
+    rslt = dict()
+    with engine.connect() as db_con:
+        previous = _set_pragmas(db_con, pragmas)
+        try:
+            with metrics.timer('insert.transaction') as counts:
+                with db_con.begin():
+                    for tab_name, tab in tabs.items():
+                        rslt[tab_name] = _insert(db_con, tab_name, tab,
+                                                 ignore=ignore)
+                    aggregates.update(db_con, {k: v for k, v in tabs.items()
+                                               if rslt[k] > 0})
+                counts['rows'] = sum(rslt.values())
+        finally:
+            _set_pragmas(db_con, previous)
+
+    return rslt
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Incremental maintenance of summary tables declared in dbtools.schema
+# (players_season_totals, teams_season_totals, teams_head_to_head).
+# Groups touched by inserted rows are collected in temporary tables, then
+# their rows are deleted and computed again from the latest versions of rows,
+# so the cost depends on the number of affected groups, not on the history.
+
+import sqlalchemy as sql
+import vsutils.metrics as metrics
+from dbtools import schema
+from dbtools import compact
+
+_count_cols = schema._count_cols
+
+# Temporary tables with keys of affected groups
+_affected = {
+    'matches': ['League', 'Season', 'MatchID'],
+    'players': ['League', 'Season', 'PlayerID'],
+    'teams': ['League', 'Season', 'TeamID']}
+
+# Latest versions of rows of affected groups
+_latest_stats = """SELECT *
+    FROM (SELECT {columns},
+              ROW_NUMBER() OVER (PARTITION BY s.League, s.Season,
+                                              s.MatchID, s.PlayerID
+                                 ORDER BY s.Timestamp DESC) AS Version
+          FROM temp._affected_{group} AS a
+          {source}
+              AND s.Season = a.Season
+              AND s.{column} = a.{column})
+    WHERE Version = 1"""
+
+# Columns and sources of _latest_stats by layout. In a compact database
+# (see dbtools.compact) rows are filtered in its table by the ID of the
+# league, so that its indexes of League are used, and the league is taken
+# from the affected group (the view would decode strings of every row)
+_stats_sources = {
+    False: ('s.*', """CROSS JOIN matches_stats AS s
+          WHERE s.League = a.League"""),
+    True: (', '.join(['a.League'] + list(
+               's."{col}"'.format(col=x.name)
+               for x in compact.tables['matches_stats'].c
+               if x.name != 'League')),
+           """CROSS JOIN strings AS l
+          CROSS JOIN matches_stats_data AS s
+          WHERE l.Value = a.League
+              AND s.League = l.ID""")}
+
+_sets_played = ' + '.join(
+    '({col} IS NOT NULL)'.format(col=x)
+    for x in ['SetI', 'SetII', 'SetIII', 'SetIV', 'SetV', 'SetGolden'])
+
+
+def _sums(prefix=''):
+    rslt = ',\n        '.join(
+        'SUM({prefix}{col}) AS {col}'.format(prefix=prefix, col=x)
+        for x in _count_cols)
+    return rslt
+
+
+# Queries recomputing summary tables, {latest} stands for the latest
+# versions of rows of their groups (see _queries)
+_templates = {
+    'players_season_totals': """INSERT INTO players_season_totals
+    SELECT League, Season, PlayerID, TeamID,
+        COUNT(*),
+        SUM({sets}),
+        {sums}
+    FROM ({latest})
+    GROUP BY League, Season, PlayerID, TeamID""".format(
+        sets=_sets_played,
+        sums=_sums(),
+        latest='{latest}'),
+
+    # Sets of a team in a match are the ones any of its players was in
+    'teams_season_totals': """INSERT INTO teams_season_totals
+    SELECT s.League, s.Season, s.TeamID,
+        COUNT(*),
+        SUM(m.SetsPlayed),
+        {outer_sums}
+    FROM (SELECT League, Season, TeamID, MatchID,
+              {sums}
+          FROM ({latest})
+          GROUP BY League, Season, TeamID, MatchID) AS s
+    JOIN (SELECT League, Season, TeamID, MatchID,
+              MAX(SetI IS NOT NULL) + MAX(SetII IS NOT NULL) +
+              MAX(SetIII IS NOT NULL) + MAX(SetIV IS NOT NULL) +
+              MAX(SetV IS NOT NULL) + MAX(SetGolden IS NOT NULL)
+                  AS SetsPlayed
+          FROM ({latest})
+          GROUP BY League, Season, TeamID, MatchID) AS m
+        USING (League, Season, TeamID, MatchID)
+    GROUP BY s.League, s.Season, s.TeamID""".format(
+        sums=_sums(),
+        outer_sums=_sums('s.'),
+        latest='{latest}'),
+
+    # Points are given as 'home:away' for every set
+    'teams_head_to_head': """INSERT INTO teams_head_to_head
+    WITH info AS (
+        SELECT League, Season, MatchID, Home, Away
+        FROM (SELECT i.*,
+                  ROW_NUMBER() OVER (PARTITION BY i.League, i.Season,
+                                                  i.MatchID
+                                     ORDER BY i.Timestamp DESC) AS Version
+              FROM (SELECT m.League, m.Season, m.MatchID
+                    FROM temp._affected_teams AS a
+                    CROSS JOIN matches_info AS m
+                    WHERE m.League = a.League
+                        AND m.Season = a.Season
+                        AND m.Home = a.TeamID
+                    UNION
+                    SELECT m.League, m.Season, m.MatchID
+                    FROM temp._affected_teams AS a
+                    CROSS JOIN matches_info AS m
+                    WHERE m.League = a.League
+                        AND m.Season = a.Season
+                        AND m.Away = a.TeamID) AS k
+              CROSS JOIN matches_info AS i
+              WHERE i.League = k.League
+                  AND i.Season = k.Season
+                  AND i.MatchID = k.MatchID)
+        WHERE Version = 1),
+    sets AS (
+        SELECT League, Season, MatchID,
+            CAST(substr(Points, 1, instr(Points, ':') - 1) AS INTEGER)
+                AS HomePoints,
+            CAST(substr(Points, instr(Points, ':') + 1) AS INTEGER)
+                AS AwayPoints
+        FROM (SELECT r.*,
+                  ROW_NUMBER() OVER (PARTITION BY r.League, r.Season,
+                                                  r.MatchID, r."Set"
+                                     ORDER BY r.Timestamp DESC) AS Version
+              FROM info AS k
+              CROSS JOIN matches_results AS r
+              WHERE r.League = k.League
+                  AND r.Season = k.Season
+                  AND r.MatchID = k.MatchID)
+        WHERE Version = 1
+            AND instr(Points, ':') > 0),
+    matches AS (
+        SELECT i.League, i.Season, i.Home, i.Away,
+            SUM(s.HomePoints > s.AwayPoints) AS HomeSets,
+            SUM(s.HomePoints < s.AwayPoints) AS AwaySets,
+            SUM(s.HomePoints) AS HomePoints,
+            SUM(s.AwayPoints) AS AwayPoints
+        FROM info AS i
+        JOIN sets AS s
+            USING (League, Season, MatchID)
+        GROUP BY i.League, i.Season, i.MatchID),
+    sides AS (
+        SELECT League, Season, Home AS TeamID, Away AS OpponentID,
+            HomeSets AS SetsWon, AwaySets AS SetsLost,
+            HomePoints AS PointsWon, AwayPoints AS PointsLost
+        FROM matches
+        UNION ALL
+        SELECT League, Season, Away, Home,
+            AwaySets, HomeSets, AwayPoints, HomePoints
+        FROM matches)
+    SELECT s.League, s.Season, s.TeamID, s.OpponentID,
+        COUNT(*),
+        SUM(s.SetsWon > s.SetsLost),
+        SUM(s.SetsWon < s.SetsLost),
+        SUM(s.SetsWon),
+        SUM(s.SetsLost),
+        SUM(s.PointsWon),
+        SUM(s.PointsLost)
+    FROM sides AS s
+    WHERE EXISTS (SELECT 1 FROM temp._affected_teams AS a
+                  WHERE a.League = s.League
+                      AND a.Season = s.Season
+                      AND a.TeamID = s.TeamID)
+    GROUP BY s.League, s.Season, s.TeamID, s.OpponentID"""}
+
+# Groups of every summary table
+_groups = {'players_season_totals': ('players', 'PlayerID'),
+           'teams_season_totals': ('teams', 'TeamID'),
+           'teams_head_to_head': ('teams', 'TeamID')}
+
+# Queries by layout (compact or not), with the latest versions of rows
+# of their groups
+_queries = {layout: {tab: query.replace('{latest}', _latest_stats.format(
+                         columns=columns, source=source,
+                         group=_groups[tab][0], column=_groups[tab][1]))
+                     for tab, query in _templates.items()}
+            for layout, (columns, source) in _stats_sources.items()}
+
+_delete = """DELETE FROM {tab}
+    WHERE (League, Season, {column}) IN (
+        SELECT League, Season, {column} FROM temp._affected_{group})"""
+
+
+def _exists(db_con):
+    names = list(x.name for x in schema.aggregates)
+    rslt = all(sql.inspect(db_con).has_table(x) for x in names)
+    return rslt
+
+
+def _create_affected(db_con):
+    for group, columns in _affected.items():
+        db_con.exec_driver_sql(
+            'CREATE TEMP TABLE IF NOT EXISTS _affected_{group} '
+            '({cols}, PRIMARY KEY ({cols}))'.format(group=group,
+                                                    cols=', '.join(columns)))
+        db_con.exec_driver_sql('DELETE FROM temp._affected_' + group)
+
+
+def _add_affected(db_con, group, tab):
+    columns = _affected[group]
+    keys = tab.loc[:, columns].drop_duplicates()
+    keys = keys.astype(object).to_dict('records')
+    if len(keys) == 0:
+        return
+
+    statement = 'INSERT OR IGNORE INTO temp._affected_{group} VALUES ({vals})'
+    statement = statement.format(group=group,
+                                 vals=', '.join(':' + x for x in columns))
+    db_con.execute(sql.text(statement), keys)
+
+
+def _recompute(db_con):
+    # Teams playing in affected matches (also the ones without statistics)
+    db_con.exec_driver_sql("""INSERT OR IGNORE INTO temp._affected_teams
+    SELECT i.League, i.Season, i.Home
+    FROM matches_info AS i
+    JOIN temp._affected_matches AS a
+        USING (League, Season, MatchID)
+    UNION
+    SELECT i.League, i.Season, i.Away
+    FROM matches_info AS i
+    JOIN temp._affected_matches AS a
+        USING (League, Season, MatchID)""")
+
+    queries = _queries[compact.is_compact(db_con)]
+    for tab, (group, column) in _groups.items():
+        db_con.exec_driver_sql(_delete.format(tab=tab, group=group,
+                                              column=column))
+        db_con.exec_driver_sql(queries[tab])
+
+
+def update(db_con, tabs):
+    """
+    Recomputes groups of summary tables affected by inserted tables (a dict
+    of pd.DataFrames named as database tables, see dbtools.bulk_insert):
+    players and teams with new statistics and teams playing in matches with
+    new information or results. Runs in the transaction of the insert.
+    Does nothing if the summary tables do not exist (see create).
+    Recorded as 'insert.aggregates' metrics.
+    """
+
+    if not _exists(db_con):
+        return
+
+    with metrics.timer('insert.aggregates'):
+        _create_affected(db_con)
+        for tab_name in ['matches_info', 'matches_stats', 'matches_results']:
+            tab = tabs.get(tab_name)
+            if tab is None or len(tab) == 0:
+                continue
+
+            _add_affected(db_con, 'matches', tab)
+            if tab_name == 'matches_stats':
+                _add_affected(db_con, 'players', tab)
+                _add_affected(db_con, 'teams', tab)
+
+        _recompute(db_con)
+
+
+def rebuild(engine):
+    """
+    Computes summary tables again from all rows in the database.
+    """
+
+    with engine.begin() as db_con:
+        _create_affected(db_con)
+        for group, columns in _affected.items():
+            tab = {'matches': 'matches_info',
+                   'players': 'matches_stats',
+                   'teams': 'matches_stats'}[group]
+            db_con.exec_driver_sql(
+                'INSERT OR IGNORE INTO temp._affected_{group} '
+                'SELECT DISTINCT {cols} FROM {tab}'.format(
+                    group=group, cols=', '.join(columns), tab=tab))
+        _recompute(db_con)
+
+
+def create(engine):
+    """
+    Creates summary tables missing in a database (e.g. one created before
+    they were declared) and fills them from existing rows.
+    """
+
+    with engine.connect() as db_con:
+        exists = _exists(db_con)
+
+    if not exists:
+        schema.meta.create_all(engine, tables=schema.aggregates)
+        rebuild(engine)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Compact storage of polish.db: rows of a table from dbtools.schema are kept
+# in '{table}_data' with 16-byte binary hashes and repeated strings replaced
+# by IDs from the 'strings' lookup table. A view with the original name of
+# the table decodes them, so all queries work the same with both layouts.
+# Inserts are encoded by dbtools.bulk_insert and dbtools.insert_new.
+
+import sqlalchemy as sql
+from dbtools import schema
+
+VERSION = 1
+
+# Repeated strings stored as IDs of the 'strings' table
+DICT_COLUMNS = ['League', 'PlayerName', 'TeamName', 'Position', 'Stage',
+                'FirstReferee', 'SecondReferee', 'Commissioner',
+                'InspectorReferee', 'Arena', 'Address', 'City']
+
+# Scraped tables, stored compactly (summary tables and the negative cache
+# stay as they are)
+TABLES = list(x.name for x in schema.meta.sorted_tables
+              if x not in schema.aggregates + schema.caches)
+
+meta = sql.MetaData()
+
+strings = sql.Table(
+    'strings', meta,
+    sql.Column('ID', sql.Integer, primary_key=True),
+    sql.Column('Value', sql.String, nullable=False, unique=True))
+
+schema_info = sql.Table(
+    'schema_info', meta,
+    sql.Column('Key', sql.String, primary_key=True),
+    sql.Column('Value', sql.String, nullable=False))
+
+
+def _compact_column(column):
+    if column.name == 'Hash':
+        col_type = sql.LargeBinary(16)
+    elif column.name in DICT_COLUMNS:
+        col_type = sql.Integer
+    else:
+        col_type = column.type
+
+    rslt = sql.Column(column.name, col_type,
+                      primary_key=column.primary_key,
+                      nullable=column.nullable)
+    return rslt
+
+
+tables = dict()
+for _table in schema.meta.sorted_tables:
+    if _table.name in TABLES:
+        tables[_table.name] = sql.Table(
+            _table.name + '_data', meta,
+            *(_compact_column(x) for x in _table.c))
+
+indexes = list()
+for _index in schema.indexes:
+    if _index.table.name in TABLES:
+        _name = _index.table.name
+        indexes.append(sql.Index(
+            _index.name.replace(_name, _name + '_data'),
+            *(tables[_name].c[x.name] for x in _index.columns)))
+
+
+def _view(table):
+    """
+    Returns a statement creating a view decoding a compact table.
+    """
+
+    columns = list()
+    joins = list()
+    for column in table.c:
+        name = '"' + column.name + '"'
+        if column.name == 'Hash':
+            columns.append('lower(hex(d."Hash")) AS "Hash"')
+        elif column.name in DICT_COLUMNS:
+            alias = 's' + str(len(joins))
+            columns.append('{alias}.Value AS {name}'.format(alias=alias,
+                                                           name=name))
+            joins.append('LEFT JOIN strings AS {alias} '
+                         'ON {alias}.ID = d.{name}'.format(alias=alias,
+                                                           name=name))
+        else:
+            columns.append('d.' + name)
+
+    rslt = ('CREATE VIEW {name} AS\n'
+            'SELECT {cols}\n'
+            'FROM {name}_data AS d\n'
+            '{joins}')
+    rslt = rslt.format(name=table.name,
+                       cols=',\n    '.join(columns),
+                       joins='\n'.join(joins))
+    return rslt
+
+
+def is_compact(db_con):
+    """
+    Checks if a database uses the compact layout.
+    """
+
+    rslt = sql.inspect(db_con).has_table('schema_info')
+    return rslt
+
+
+def create_all(engine):
+    """
+    Creates a database in the compact layout: compact tables, their views
+    and indexes, summary tables and the negative cache.
+    """
+
+    meta.create_all(engine)
+    schema.meta.create_all(engine, tables=schema.aggregates + schema.caches)
+    with engine.begin() as db_con:
+        for tab_name in TABLES:
+            db_con.exec_driver_sql(_view(schema.meta.tables[tab_name]))
+        db_con.execute(sql.insert(schema_info),
+                       {'Key': 'version', 'Value': str(VERSION)})
+
+
+def string_ids(db_con, values):
+    """
+    Returns a dict of IDs of strings, adding missing ones to the lookup table.
+    """
+
+    values = list(set(x for x in values if x is not None))
+    if len(values) == 0:
+        return dict()
+
+    db_con.execute(sql.insert(strings).prefix_with('OR IGNORE'),
+                   list({'Value': x} for x in values))
+
+    rslt = dict()
+    for i in range(0, len(values), 500):
+        query = sql.select(strings.c.Value, strings.c.ID).where(
+            strings.c.Value.in_(values[i:(i + 500)]))
+        rslt.update(db_con.execute(query).fetchall())
+    return rslt
+
+
+def league_tables(db_con, league):
+    """
+    Returns names of scraped tables to filter rows of a league in (a dict
+    by names of TABLES) and the value of League to filter them by. In
+    a compact database these are the '{table}_data' tables and the ID
+    of the league (None if no row has it), so that indexes of League are
+    used instead of comparing decoded strings of the views.
+    """
+
+    if not is_compact(db_con):
+        return {x: x for x in TABLES}, league
+
+    query = sql.select(strings.c.ID).where(strings.c.Value == league)
+    rslt = {x: tables[x].name for x in TABLES}
+    return rslt, db_con.execute(query).scalar()
+
+
+def encode(db_con, tab):
+    """
+    Converts a pd.DataFrame of a scraped table into its compact form:
+    binary hashes and IDs of strings. Returns a new pd.DataFrame.
+    """
+
+    rslt = tab.copy()
+    if 'Hash' in rslt.columns:
+        rslt['Hash'] = rslt['Hash'].map(bytes.fromhex)
+
+    columns = list(x for x in DICT_COLUMNS if x in rslt.columns)
+    values = set()
+    for column in columns:
+        values.update(rslt[column].dropna().unique())
+    ids = string_ids(db_con, values)
+    for column in columns:
+        rslt[column] = rslt[column].map(ids).astype('Int64')
+
+    return rslt
+
+
+def _unhex(value):
+    return None if value is None else bytes.fromhex(value)
+
+
+def migrate(engine):
+    """
+    Converts a database in the layout of dbtools.schema into the compact one
+    in place, in a single transaction, and shrinks the file afterwards.
+    Does nothing if the database is already compact.
+    """
+
+    with engine.connect() as db_con:
+        if is_compact(db_con):
+            return
+        db_con.commit()
+
+        db_con.connection.driver_connection.create_function(
+            'unhex', 1, _unhex, deterministic=True)
+
+        with db_con.begin():
+            meta.create_all(db_con)
+
+            existing = sql.inspect(db_con).get_table_names()
+            for tab_name in TABLES:
+                if tab_name not in existing:
+                    continue
+
+                table = schema.meta.tables[tab_name]
+                for column in table.c:
+                    if column.name in DICT_COLUMNS:
+                        db_con.exec_driver_sql(
+                            'INSERT OR IGNORE INTO strings (Value) '
+                            'SELECT DISTINCT "{col}" FROM {tab} '
+                            'WHERE "{col}" IS NOT NULL'.format(
+                                col=column.name, tab=tab_name))
+
+                columns = list()
+                for column in table.c:
+                    name = '"' + column.name + '"'
+                    if column.name == 'Hash':
+                        columns.append('unhex(t."Hash")')
+                    elif column.name in DICT_COLUMNS:
+                        columns.append('(SELECT ID FROM strings '
+                                       'WHERE Value = t.{name})'.format(
+                                           name=name))
+                    else:
+                        columns.append('t.' + name)
+
+                db_con.exec_driver_sql(
+                    'INSERT INTO {tab}_data '
+                    'SELECT {cols} FROM {tab} AS t'.format(
+                        tab=tab_name, cols=', '.join(columns)))
+                db_con.exec_driver_sql('DROP TABLE ' + tab_name)
+                db_con.exec_driver_sql(_view(table))
+
+            db_con.execute(sql.insert(schema_info),
+                           {'Key': 'version', 'Value': str(VERSION)})
+
+        db_con.exec_driver_sql('VACUUM')
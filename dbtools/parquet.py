@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Export of polish.db tables into Parquet files partitioned by League and
+# Season ({export_dir}/{table}/League={league}/Season={season}/data.parquet)
+# and loading them back without SQLite. Requires pyarrow.
+
+import json
+import os
+import shutil
+import urllib.parse
+import pandas as pd
+import sqlalchemy as sql
+from dbtools import schema
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+MANIFEST = '_manifest.json'
+
+# Scraped tables, only inserted into, so a partition with the same number
+# of rows and the same latest Timestamp is unchanged
+TABLES = list(x.name for x in schema.meta.sorted_tables
+              if 'Timestamp' in x.c and 'League' in x.c and 'Season' in x.c
+              and x not in schema.caches)
+
+_signature_query = """SELECT League, Season, COUNT(*), MAX(Timestamp)
+    FROM {tab}
+    GROUP BY League, Season"""
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError('Parquet export requires pyarrow')
+
+
+def _arrow_type(column):
+    """
+    Returns a compact Arrow type of a column of a table from dbtools.schema.
+    Values not fitting into it raise an error when a partition is written.
+    """
+
+    if isinstance(column.type, sql.DateTime):
+        return pa.timestamp('us')
+    if isinstance(column.type, sql.Integer):
+        return pa.int32()
+    return pa.string()
+
+
+def _partition_dir(export_dir, tab_name, league, season):
+    rslt = os.path.join(export_dir, tab_name,
+                        'League=' + urllib.parse.quote(league, safe=''),
+                        'Season={season}'.format(season=season))
+    return rslt
+
+
+def _read_manifest(export_dir, tab_name):
+    path = os.path.join(export_dir, tab_name, MANIFEST)
+    if not os.path.exists(path):
+        return dict()
+
+    with open(path, 'r') as file:
+        rslt = json.load(file)
+    return rslt
+
+
+def _write_manifest(export_dir, tab_name, manifest):
+    path = os.path.join(export_dir, tab_name, MANIFEST)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'w') as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def _export_partition(db_con, table, path, league, season):
+    columns = list(x for x in table.c if x.name not in ['League', 'Season'])
+    query = ('SELECT {cols} FROM {tab} '
+             'WHERE League = :league AND Season = :season')
+    query = query.format(cols=', '.join('"' + x.name + '"' for x in columns),
+                         tab=table.name)
+
+    tab = pd.read_sql(sql.text(query), db_con,
+                      params={'league': league, 'season': season},
+                      parse_dates=list(x.name for x in columns
+                                       if isinstance(x.type, sql.DateTime)))
+
+    arrow_schema = pa.schema(list((x.name, _arrow_type(x)) for x in columns))
+    tab = pa.Table.from_pandas(tab, schema=arrow_schema, preserve_index=False)
+
+    # Written under a hidden name first, so readers never see partial files
+    os.makedirs(path, exist_ok=True)
+    pq.write_table(tab, os.path.join(path, '.data.parquet'),
+                   compression='zstd')
+    os.replace(os.path.join(path, '.data.parquet'),
+               os.path.join(path, 'data.parquet'))
+
+
+def export_parquet(engine, export_dir, tables=None, full=False):
+    """
+    Exports tables (by default all of TABLES) into Parquet files, one per
+    League and Season. Only partitions which changed since the previous
+    export (see MANIFEST) are written again, unless full is given.
+    Partitions no longer in the database are removed.
+    Returns a dict with lists of exported (League, Season) pairs.
+    """
+
+    _require_pyarrow()
+    if tables is None:
+        tables = TABLES
+
+    rslt = dict()
+    with engine.connect() as db_con:
+        for tab_name in tables:
+            table = schema.meta.tables[tab_name]
+            manifest = dict() if full else _read_manifest(export_dir, tab_name)
+
+            signatures = db_con.execute(
+                sql.text(_signature_query.format(tab=tab_name))).fetchall()
+            current = dict()
+            exported = list()
+            for league, season, n, stamp in signatures:
+                key = '{league}/{season}'.format(league=league, season=season)
+                current[key] = [n, stamp]
+                if manifest.get(key) == current[key]:
+                    continue
+
+                path = _partition_dir(export_dir, tab_name, league, season)
+                _export_partition(db_con, table, path, league, season)
+                exported.append((league, season))
+
+            for key in set(manifest) - set(current):
+                league, season = key.rsplit('/', 1)
+                shutil.rmtree(_partition_dir(export_dir, tab_name,
+                                             league, int(season)),
+                              ignore_errors=True)
+
+            _write_manifest(export_dir, tab_name, current)
+            rslt[tab_name] = exported
+
+    return rslt
+
+
+def read_parquet(export_dir, tab_name, columns=None, leagues=None,
+                 seasons=None):
+    """
+    Reads an exported table (see export_parquet) into a pd.DataFrame,
+    optionally only given columns and partitions (leagues and seasons), which
+    are selected before any file is read. Files are memory-mapped, string
+    columns other than Hash are read as categoricals.
+    """
+
+    _require_pyarrow()
+
+    table = schema.meta.tables[tab_name]
+    strings = list(x.name for x in table.c
+                   if isinstance(x.type, sql.String) and x.name != 'Hash')
+    file_format = ds.ParquetFileFormat(
+        read_options={'dictionary_columns': strings})
+    partitioning = ds.partitioning(
+        pa.schema([('League', pa.string()), ('Season', pa.int32())]),
+        flavor='hive')
+
+    # Schema is given, so that a table without any partitions can be read
+    fields = list()
+    for column in table.c:
+        if column.name in strings:
+            fields.append((column.name,
+                           pa.dictionary(pa.int32(), pa.string())))
+        else:
+            fields.append((column.name, _arrow_type(column)))
+
+    dataset = ds.dataset(os.path.join(export_dir, tab_name),
+                         schema=pa.schema(fields),
+                         format=file_format,
+                         partitioning=partitioning,
+                         filesystem=pafs.LocalFileSystem(use_mmap=True),
+                         ignore_prefixes=['_', '.'])
+
+    condition = None
+    for name, values in [('League', leagues), ('Season', seasons)]:
+        if values is None:
+            continue
+        curr = ds.field(name).isin(list(values))
+        condition = curr if condition is None else condition & curr
+
+    if columns is not None:
+        columns = list(x for x in table.c.keys() if x in columns)
+
+    rslt = dataset.to_table(columns=columns, filter=condition).to_pandas()
+    if 'League' in rslt.columns:
+        rslt['League'] = rslt['League'].astype('category')
+
+    # Partition columns are read last, the order of the database is restored
+    rslt = rslt.loc[:, list(x for x in table.c.keys() if x in rslt.columns)]
+    return rslt
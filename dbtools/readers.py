@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Readers of polish.db tables with filters bound as parameters, a subset
+# of columns and compact types: strings as categoricals, integers as int32
+# (nullable Int32 where NULL is allowed) and dates as datetime64.
+
+import numpy as np
+import pandas as pd
+import sqlalchemy as sql
+from dbtools import schema
+
+
+def _column_type(column):
+    if isinstance(column.type, sql.DateTime):
+        return 'datetime64[ns]'
+    if isinstance(column.type, sql.Integer):
+        if column.nullable and not column.primary_key:
+            return 'Int32'
+        return np.int32
+    # Hashes are unique, categories would only add overhead
+    if column.name == 'Hash':
+        return object
+    return 'category'
+
+
+def _categories(db_con, statement):
+    """
+    Returns sorted distinct values of categorical columns of rows selected
+    by a statement, so that all chunks of a table share their categories.
+    """
+
+    subquery = statement.subquery()
+    rslt = dict()
+    for column in statement.selected_columns:
+        if _column_type(column) != 'category':
+            continue
+
+        query = sql.select(subquery.c[column.name]).distinct()
+        values = (x[0] for x in db_con.execute(query))
+        rslt[column.name] = sorted(x for x in values if x is not None)
+
+    return rslt
+
+
+def _frame(rows, columns, categories=None):
+    """
+    Builds a pd.DataFrame with compact types from fetched rows, column
+    by column. Categories of categorical columns can be given by name
+    (see _categories), otherwise they are the values of the rows.
+    """
+
+    if categories is None:
+        categories = dict()
+
+    values = list(zip(*rows))
+    if len(values) == 0:
+        values = [()] * len(columns)
+
+    rslt = dict()
+    for column, curr in zip(columns, values):
+        dtype = _column_type(column)
+        if dtype == 'category':
+            rslt[column.name] = pd.Categorical(
+                curr, categories=categories.get(column.name))
+        elif dtype == 'Int32':
+            rslt[column.name] = pd.array(curr, dtype='Int32')
+        else:
+            rslt[column.name] = np.array(curr, dtype=dtype)
+
+    rslt = pd.DataFrame(rslt)
+    return rslt
+
+
+def select(tab_name, leagues=None, seasons=None, columns=None, **ids):
+    """
+    Returns a SELECT statement of a table with given columns (by default all)
+    and rows filtered by leagues, seasons and IDs (e.g. PlayerID=[...]),
+    all values bound as parameters.
+    """
+
+    table = schema.meta.tables[tab_name]
+    if columns is None:
+        columns = list(table.c.keys())
+
+    rslt = sql.select(*(table.c[x] for x in columns))
+    filters = dict(ids, League=leagues, Season=seasons)
+    for name, values in filters.items():
+        if values is None:
+            continue
+        if name not in table.c:
+            raise ValueError('Unknown column of {tab}: {name}'.format(
+                tab=tab_name, name=name))
+        if np.isscalar(values):
+            values = [values]
+        rslt = rslt.where(table.c[name].in_(list(values)))
+
+    return rslt
+
+
+def _read_chunks(engine, statement, chunk_size):
+    columns = list(statement.selected_columns)
+    with engine.connect() as db_con:
+        # Categories are set once, chunks can be concatenated without
+        # falling back to object columns
+        categories = _categories(db_con, statement)
+        result = db_con.execution_options(stream_results=True).execute(
+            statement)
+        for rows in result.partitions(chunk_size):
+            yield _frame(rows, columns, categories)
+
+
+def read_table(engine, tab_name, leagues=None, seasons=None, columns=None,
+               chunk_size=None, **ids):
+    """
+    Reads a table filtered by leagues, seasons and IDs (see select) into
+    a pd.DataFrame with compact types. With chunk_size, returns a generator
+    of pd.DataFrames with at most chunk_size rows each instead, categorical
+    columns of all of them have the same categories.
+    """
+
+    statement = select(tab_name, leagues=leagues, seasons=seasons,
+                       columns=columns, **ids)
+    if chunk_size is not None:
+        return _read_chunks(engine, statement, chunk_size)
+
+    with engine.connect() as db_con:
+        rows = db_con.execute(statement).fetchall()
+
+    rslt = _frame(rows, list(statement.selected_columns))
+    return rslt
+
+
+# %% Readers of tables
+def read_players_list(engine, leagues=None, seasons=None, columns=None,
+                      chunk_size=None, **ids):
+    return read_table(engine, 'players_list', leagues, seasons, columns,
+                      chunk_size, **ids)
+
+
+def read_teams_list(engine, leagues=None, seasons=None, columns=None,
+                    chunk_size=None, **ids):
+    return read_table(engine, 'teams_list', leagues, seasons, columns,
+                      chunk_size, **ids)
+
+
+def read_matches_list(engine, leagues=None, seasons=None, columns=None,
+                      chunk_size=None, **ids):
+    return read_table(engine, 'matches_list', leagues, seasons, columns,
+                      chunk_size, **ids)
+
+
+def read_players_info(engine, leagues=None, seasons=None, columns=None,
+                      chunk_size=None, **ids):
+    return read_table(engine, 'players_info', leagues, seasons, columns,
+                      chunk_size, **ids)
+
+
+def read_teams_info(engine, leagues=None, seasons=None, columns=None,
+                    chunk_size=None, **ids):
+    return read_table(engine, 'teams_info', leagues, seasons, columns,
+                      chunk_size, **ids)
+
+
+def read_teams_roster(engine, leagues=None, seasons=None, columns=None,
+                      chunk_size=None, **ids):
+    return read_table(engine, 'teams_roster', leagues, seasons, columns,
+                      chunk_size, **ids)
+
+
+def read_matches_info(engine, leagues=None, seasons=None, columns=None,
+                      chunk_size=None, **ids):
+    return read_table(engine, 'matches_info', leagues, seasons, columns,
+                      chunk_size, **ids)
+
+
+def read_matches_stats(engine, leagues=None, seasons=None, columns=None,
+                       chunk_size=None, **ids):
+    return read_table(engine, 'matches_stats', leagues, seasons, columns,
+                      chunk_size, **ids)
+
+
+def read_matches_results(engine, leagues=None, seasons=None, columns=None,
+                         chunk_size=None, **ids):
+    return read_table(engine, 'matches_results', leagues, seasons, columns,
+                      chunk_size, **ids)
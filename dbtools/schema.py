@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sqlalchemy as sql
+
+
+meta = sql.MetaData()
+
+
+# %% Define lists
+p_list = sql.Table(
+    'players_list', meta,
+    sql.Column('League', sql.String, primary_key=True),
+    sql.Column('Season', sql.Integer, primary_key=True),
+    sql.Column('PlayerID', sql.Integer, primary_key=True),
+    sql.Column('Hash', sql.String, primary_key=True),
+    sql.Column('Timestamp', sql.DateTime, nullable=False),
+    extend_existing=True)
+
+t_list = sql.Table(
+    'teams_list', meta,
+    sql.Column('League', sql.String, primary_key=True),
+    sql.Column('Season', sql.Integer, primary_key=True),
+    sql.Column('TeamID', sql.Integer, primary_key=True),
+    sql.Column('Hash', sql.String, primary_key=True),
+    sql.Column('Timestamp', sql.DateTime, nullable=False),
+    extend_existing=True)
+
+m_list = sql.Table(
+    'matches_list', meta,
+    sql.Column('League', sql.String, primary_key=True),
+    sql.Column('Season', sql.Integer, primary_key=True),
+    sql.Column('MatchID', sql.Integer, primary_key=True),
+    sql.Column('Hash', sql.String, primary_key=True),
+    sql.Column('Timestamp', sql.DateTime, nullable=False),
+    extend_existing=True)
+
+
+# %% Define player tables
+p_info = sql.Table(
+    'players_info', meta,
+    sql.Column('League', sql.String, primary_key=True),
+    sql.Column('Season', sql.Integer, primary_key=True),
+    sql.Column('PlayerID', sql.Integer, primary_key=True),
+    sql.Column('PlayerName', sql.String, nullable=False),
+    sql.Column('TeamID', sql.Integer, nullable=False),
+    sql.Column('DateOfBirth', sql.DateTime),
+    sql.Column('Position', sql.String),
+    sql.Column('Height', sql.Integer),
+    sql.Column('Weight', sql.Integer),
+    sql.Column('Reach', sql.Integer),
+    sql.Column('Hash', sql.String, primary_key=True),
+    sql.Column('Timestamp', sql.DateTime, nullable=False),
+    extend_existing=True)
+
+
+# %% Define team tables
+t_info = sql.Table(
+    'teams_info', meta,
+    sql.Column('League', sql.String, primary_key=True),
+    sql.Column('Season', sql.Integer, primary_key=True),
+    sql.Column('TeamID', sql.Integer, primary_key=True),
+    sql.Column('TeamName', sql.String, nullable=False),
+    sql.Column('Hash', sql.String, primary_key=True),
+    sql.Column('Timestamp', sql.DateTime, nullable=False),
+    extend_existing=True)
+
+t_roster = sql.Table(
+    'teams_roster', meta,
+    sql.Column('League', sql.String, primary_key=True),
+    sql.Column('Season', sql.Integer, primary_key=True),
+    sql.Column('TeamID', sql.Integer, primary_key=True),
+    sql.Column('PlayerID', sql.Integer, primary_key=True),
+    sql.Column('Hash', sql.String, primary_key=True),
+    sql.Column('Timestamp', sql.DateTime, nullable=False),
+    extend_existing=True)
+
+
+# %% Define match tables
+m_info = sql.Table(
+    'matches_info', meta,
+    sql.Column('League', sql.String, primary_key=True),
+    sql.Column('Season', sql.Integer, primary_key=True),
+    sql.Column('MatchID', sql.Integer, primary_key=True),
+    sql.Column('Home', sql.Integer, nullable=False),
+    sql.Column('Away', sql.Integer, nullable=False),
+    sql.Column('Date', sql.DateTime),
+    sql.Column('Stage', sql.String),
+    sql.Column('Round', sql.String),
+    sql.Column('MatchNumber', sql.String),
+    sql.Column('MVP', sql.Integer),
+    sql.Column('Spectators', sql.Integer),
+    sql.Column('FirstReferee', sql.String),
+    sql.Column('SecondReferee', sql.String),
+    sql.Column('Commissioner', sql.String),
+    sql.Column('InspectorReferee', sql.String),
+    sql.Column('Arena', sql.String),
+    sql.Column('Address', sql.String),
+    sql.Column('City', sql.String),
+    sql.Column('ArenaSize', sql.Integer),
+    sql.Column('Hash', sql.String, primary_key=True),
+    sql.Column('Timestamp', sql.DateTime, nullable=False),
+    extend_existing=True)
+
+m_stats = sql.Table(
+    'matches_stats', meta,
+    sql.Column('League', sql.String, primary_key=True),
+    sql.Column('Season', sql.Integer, primary_key=True),
+    sql.Column('MatchID', sql.Integer, primary_key=True),
+    sql.Column('TeamID', sql.Integer),
+    sql.Column('PlayerID', sql.Integer, primary_key=True),
+    sql.Column('SetI', sql.String),
+    sql.Column('SetII', sql.String),
+    sql.Column('SetIII', sql.String),
+    sql.Column('SetIV', sql.String),
+    sql.Column('SetV', sql.String),
+    sql.Column('SetGolden', sql.String),
+    sql.Column('Points', sql.Integer),
+    sql.Column('BreakPoints', sql.Integer),
+    sql.Column('PointsRatio', sql.Integer),
+    sql.Column('ServeTotal', sql.Integer),
+    sql.Column('ServeErrors', sql.Integer),
+    sql.Column('ServeAces', sql.Integer),
+    sql.Column('ServeSlashes', sql.Integer),
+    sql.Column('ReceptionTotal', sql.Integer),
+    sql.Column('ReceptionErrors', sql.Integer),
+    sql.Column('ReceptionNegative', sql.Integer),
+    sql.Column('ReceptionPositive', sql.Integer),
+    sql.Column('ReceptionPerfect', sql.Integer),
+    sql.Column('AttackTotal', sql.Integer),
+    sql.Column('AttackBlocked', sql.Integer),
+    sql.Column('AttackErrors', sql.Integer),
+    sql.Column('AttackKills', sql.Integer),
+    sql.Column('BlockPoints', sql.Integer),
+    sql.Column('BlockAssists', sql.Integer),
+    sql.Column('Hash', sql.String, primary_key=True),
+    sql.Column('Timestamp', sql.DateTime, nullable=False),
+    extend_existing=True)
+
+m_results = sql.Table(
+    'matches_results', meta,
+    sql.Column('League', sql.String, primary_key=True),
+    sql.Column('Season', sql.Integer, primary_key=True),
+    sql.Column('MatchID', sql.Integer, primary_key=True),
+    sql.Column('Set', sql.Integer, primary_key=True),
+    sql.Column('Time', sql.String),
+    sql.Column('Points', sql.String),
+    sql.Column('Result', sql.String),
+    sql.Column('Hash', sql.String, primary_key=True),
+    sql.Column('Timestamp', sql.DateTime, nullable=False),
+    extend_existing=True)
+
+
+# %% Aggregates
+# Summary tables maintained by dbtools.aggregates on every insert, computed
+# from the latest versions of rows (the ones with the newest Timestamp)
+_count_cols = ['Points', 'BreakPoints', 'PointsRatio',
+               'ServeTotal', 'ServeErrors', 'ServeAces', 'ServeSlashes',
+               'ReceptionTotal', 'ReceptionErrors', 'ReceptionNegative',
+               'ReceptionPositive', 'ReceptionPerfect',
+               'AttackTotal', 'AttackBlocked', 'AttackErrors', 'AttackKills',
+               'BlockPoints', 'BlockAssists']
+
+p_totals = sql.Table(
+    'players_season_totals', meta,
+    sql.Column('League', sql.String, primary_key=True),
+    sql.Column('Season', sql.Integer, primary_key=True),
+    sql.Column('PlayerID', sql.Integer, primary_key=True),
+    sql.Column('TeamID', sql.Integer, primary_key=True),
+    sql.Column('Matches', sql.Integer, nullable=False),
+    sql.Column('SetsPlayed', sql.Integer, nullable=False),
+    *(sql.Column(x, sql.Integer) for x in _count_cols),
+    extend_existing=True)
+
+t_totals = sql.Table(
+    'teams_season_totals', meta,
+    sql.Column('League', sql.String, primary_key=True),
+    sql.Column('Season', sql.Integer, primary_key=True),
+    sql.Column('TeamID', sql.Integer, primary_key=True),
+    sql.Column('Matches', sql.Integer, nullable=False),
+    sql.Column('SetsPlayed', sql.Integer, nullable=False),
+    *(sql.Column(x, sql.Integer) for x in _count_cols),
+    extend_existing=True)
+
+t_h2h = sql.Table(
+    'teams_head_to_head', meta,
+    sql.Column('League', sql.String, primary_key=True),
+    sql.Column('Season', sql.Integer, primary_key=True),
+    sql.Column('TeamID', sql.Integer, primary_key=True),
+    sql.Column('OpponentID', sql.Integer, primary_key=True),
+    sql.Column('Matches', sql.Integer, nullable=False),
+    sql.Column('Wins', sql.Integer, nullable=False),
+    sql.Column('Losses', sql.Integer, nullable=False),
+    sql.Column('SetsWon', sql.Integer, nullable=False),
+    sql.Column('SetsLost', sql.Integer, nullable=False),
+    sql.Column('PointsWon', sql.Integer, nullable=False),
+    sql.Column('PointsLost', sql.Integer, nullable=False),
+    extend_existing=True)
+
+aggregates = [p_totals, t_totals, t_h2h]
+
+
+# %% Caches of pages
+# Player pages redirected to another season (the player did not play in
+# the season), not requested again until they expire (see
+# dbtools.get_skipped_ids). Pages still redirected after that get a new row.
+p_skipped = sql.Table(
+    'players_skipped', meta,
+    sql.Column('League', sql.String, primary_key=True),
+    sql.Column('Season', sql.Integer, primary_key=True),
+    sql.Column('PlayerID', sql.Integer, primary_key=True),
+    sql.Column('Hash', sql.String, nullable=False),
+    sql.Column('Timestamp', sql.DateTime, primary_key=True),
+    extend_existing=True)
+
+# Fingerprints of match, team and player pages whose tables were inserted (see
+# scraping.polish.iter_fetch_all), pages with the latest fingerprint of their
+# URL are not parsed again. A changed page (or version of the parsers) gets
+# a new row.
+pg_fingerprints = sql.Table(
+    'pages_fingerprints', meta,
+    sql.Column('League', sql.String, primary_key=True),
+    sql.Column('Season', sql.Integer, primary_key=True),
+    sql.Column('URL', sql.String, primary_key=True),
+    sql.Column('Fingerprint', sql.String, nullable=False),
+    sql.Column('Hash', sql.String, nullable=False),
+    sql.Column('Timestamp', sql.DateTime, primary_key=True),
+    extend_existing=True)
+
+# Validators (ETag and Last-Modified headers) of match, team and player pages
+# whose tables were inserted by a version of the parsers, these pages are
+# requested conditionally (see scraping.polish.make_request) until the version
+# changes. Changed validators get a new row.
+pg_validators = sql.Table(
+    'pages_validators', meta,
+    sql.Column('League', sql.String, primary_key=True),
+    sql.Column('Season', sql.Integer, primary_key=True),
+    sql.Column('URL', sql.String, primary_key=True),
+    sql.Column('ETag', sql.String),
+    sql.Column('LastModified', sql.String),
+    sql.Column('ParserVersion', sql.Integer, nullable=False),
+    sql.Column('Hash', sql.String, nullable=False),
+    sql.Column('Timestamp', sql.DateTime, primary_key=True),
+    extend_existing=True)
+
+caches = [p_skipped, pg_fingerprints, pg_validators]
+
+
+# %% Secondary indexes
+# Lookups by (League, Season) are served by primary keys, which all start
+# with these columns. Indexes below cover IDs used alone and in joins.
+indexes = [
+    sql.Index('ix_players_info_PlayerID', p_info.c.PlayerID),
+    sql.Index('ix_players_info_TeamID', p_info.c.TeamID),
+    sql.Index('ix_teams_roster_PlayerID', t_roster.c.PlayerID),
+    sql.Index('ix_matches_info_MatchID', m_info.c.MatchID),
+    sql.Index('ix_matches_info_Home', m_info.c.Home),
+    sql.Index('ix_matches_info_Away', m_info.c.Away),
+    sql.Index('ix_matches_stats_MatchID', m_stats.c.MatchID),
+    sql.Index('ix_matches_stats_PlayerID', m_stats.c.PlayerID),
+    sql.Index('ix_matches_stats_TeamID', m_stats.c.TeamID),
+    sql.Index('ix_matches_stats_League_Season_TeamID',
+              m_stats.c.League, m_stats.c.Season, m_stats.c.TeamID),
+    sql.Index('ix_matches_stats_League_Season_PlayerID',
+              m_stats.c.League, m_stats.c.Season, m_stats.c.PlayerID),
+    sql.Index('ix_matches_results_MatchID', m_results.c.MatchID),
+    sql.Index('ix_players_season_totals_PlayerID', p_totals.c.PlayerID),
+    sql.Index('ix_teams_head_to_head_OpponentID', t_h2h.c.OpponentID)]
@@ -52,3 +52,23 @@ team_ex
 teams = spl.batch_fetch_team_info(team_list)
 t_info = teams['information']
 t_roster = teams['roster']
+
+
+# %% Stats
+dbt = importlib.import_module('dbtools')
+stt = importlib.import_module('stats.tables')
+
+db = dbt.get_engine('polish')
+stats = stt.load_stats(db, leagues=[league])
+players = stt.league_table(stats, level='player')
+teams = stt.league_table(stats, level='team')
+seasons = stt.league_table(stats, level='season')
+
+# Typed reads with filters, e.g. two seasons of statistics of some players
+dbr = importlib.import_module('dbtools.readers')
+
+p_stats = dbr.read_matches_stats(db, leagues=[league], seasons=sns,
+                                 columns=['MatchID', 'PlayerID', 'Points'],
+                                 PlayerID=ids)
+for chunk in dbr.read_matches_stats(db, leagues=[league], chunk_size=10000):
+    pass
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import multiprocessing as mp
+import queue
+from urllib.parse import urlsplit
+import vsutils as vsu
+import vsutils.metrics as metrics
+import scraping.polish as spl
+import dbtools as dbt
+import dbtools.readers as dbr
+
+
+def prepare_tabs(tabs):
+    """
+    Adds hashes and timestamps to all tables fetched by scraping.polish.
+    """
+
+    for tab in tabs.keys():
+        vsu.add_hash(tabs[tab])
+        vsu.add_timestamp(tabs[tab])
+
+
+def rehash_matches_info(engine):
+    """
+    Hashes stored rows of matches_info again the way prepare_tabs hashes
+    new ones, i.e. with all columns of scraping.polish.MATCH_INFO_COLUMNS
+    in a fixed order and types (see scraping.polish.match_info_frame).
+    Rows inserted before the columns were fixed were hashed as parts of
+    whole seasons, with the columns and types depending on the other matches
+    of a season, so unchanged matches would be inserted again. Rows which
+    already have their hashes are left alone, so it can be run every time.
+    Returns the number of updated rows.
+    """
+
+    rows = dbr.read_table(engine, 'matches_info')
+    if len(rows) == 0:
+        return 0
+
+    info = spl.match_info_frame(rows.drop(columns=['Hash', 'Timestamp']))
+    info = info.astype({x: object for x in info.columns
+                        if info[x].dtype == 'category'})
+    hashes = vsu.create_hashes(info)
+
+    keys = rows.loc[hashes != rows.Hash, ['League', 'Season', 'MatchID',
+                                           'Hash']]
+    keys = keys.astype({'League': object, 'Season': int, 'MatchID': int})
+    keys['NewHash'] = hashes[keys.index]
+    rslt = dbt.update_hashes(engine, 'matches_info', keys)
+    return rslt
+
+
+def print_inserted(rows_aff, skip_empty=False):
+    """
+    Prints numbers of inserted rows returned by dbtools.bulk_insert.
+    """
+
+    for tab in rows_aff.keys():
+        if skip_empty and rows_aff[tab] == 0:
+            continue
+
+        print("Inserted {n} rows into '{tab}'...".format(
+              n=rows_aff[tab],
+              tab=tab))
+
+
+def insert_chunks(engine, chunks, pragmas=None):
+    """
+    Prepares and inserts chunks of tables (e.g. from
+    scraping.polish.iter_fetch_all) one by one, each in its own transaction,
+    so that everything inserted before a failure stays in the database.
+    Returns a dict with total numbers of inserted rows.
+    """
+
+    rslt = dict()
+    for tabs in chunks:
+        # Nothing left, e.g. all pages of the chunk were unchanged
+        if len(tabs) == 0:
+            continue
+
+        prepare_tabs(tabs)
+        rows_aff = dbt.bulk_insert(engine, tabs, ignore=True, pragmas=pragmas)
+        for tab in rows_aff.keys():
+            rslt[tab] = rslt.get(tab, 0) + rows_aff[tab]
+
+    return rslt
+
+
+def _backfill_worker(tasks, results, workers, chunk_size,
+                     cache_dir, cache_mode):
+    """
+    Fetches (League, Season, skip, fingerprints, validators) tasks from
+    the tasks queue until None is received. Prepared chunks of tables are
+    put into the results queue, followed by metrics of the pair (see
+    vsutils.metrics) and a message that the pair is done (or an error
+    message).
+    """
+
+    # Metrics inherited from the parent are its own
+    metrics.reset()
+    if cache_dir is not None:
+        spl.set_cache(cache_dir, mode=cache_mode)
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+
+        league, season, skip, fingerprints, validators = task
+        print('Fetching data for {league}: {start}/{end}...'.format(
+            league=league,
+            start=season,
+            end=season + 1))
+
+        try:
+            for tabs in spl.iter_fetch_all(league, season, workers=workers,
+                                           skip=skip, chunk_size=chunk_size,
+                                           fingerprints=fingerprints,
+                                           validators=validators):
+                if len(tabs) == 0:
+                    continue
+                prepare_tabs(tabs)
+                results.put(('chunk', league, season, tabs))
+            message, content = 'done', None
+        except Exception as err:
+            message, content = 'error', repr(err)
+
+        results.put(('metrics', league, season,
+                     metrics.snapshot(clear=True)))
+        results.put((message, league, season, content))
+
+
+def backfill(engine, combinations, processes=1, workers=1, chunk_size=50,
+             queue_size=2, resume=True, cache_dir=None, cache_mode='read',
+             pragmas=None):
+    """
+    Fetches and inserts all (League, Season) pairs from combinations.
+    Pairs are fetched by a number of worker processes (each using a given
+    number of request workers, see scraping.polish.batch_map), all pairs
+    of a host by the same one, so that requests to a host are limited
+    by scraping.polish.HOST_LIMIT across processes as well (at most one
+    process per host is started). Chunks of their tables (see
+    scraping.polish.iter_fetch_all) are passed through a bounded queue
+    to this process, the only one writing into the database.
+    Every chunk is inserted in its own transaction. With resume, pages already
+    complete in the database are not fetched again (see
+    dbtools.get_complete_ids), so a failed run continues where it stopped,
+    and pages unchanged since they were inserted are neither downloaded nor
+    parsed again (see dbtools.get_validators and dbtools.get_fingerprints).
+    Metrics of the workers are merged into the ones of this process.
+    Returns a list of (League, Season, error) for pairs which failed,
+    including the ones left unfinished by workers which died.
+    """
+
+    # Forked workers inherit the module state (e.g. page cache settings)
+    # and do not rerun the calling script
+    ctx = mp.get_context('fork')
+    results = ctx.Queue(maxsize=queue_size)
+
+    pairs = list((x[0], int(x[1]))
+                 for x in combinations.loc[:, ['League', 'Season']].values)
+
+    # Host semaphores are per process, so pairs of a host are never split
+    # between workers; hosts with most pairs are assigned first, each to
+    # the worker with fewest pairs so far
+    hosts = dict()
+    for league, season in pairs:
+        host = urlsplit(spl.url_league(league)).netloc
+        hosts.setdefault(host, list()).append((league, season))
+    processes = max(1, min(processes, len(hosts)))
+    assigned = list(list() for _ in range(processes))
+    for curr in sorted(hosts.values(), key=len, reverse=True):
+        min(assigned, key=len).extend(curr)
+
+    tasks = list(ctx.Queue() for _ in range(processes))
+    for curr_tasks, curr_pairs in zip(tasks, assigned):
+        for league, season in curr_pairs:
+            if resume:
+                skip = dbt.get_complete_ids(engine, league, season)
+                fingerprints = dbt.get_fingerprints(engine, league, season)
+                validators = dbt.get_validators(engine, league, season,
+                                                spl.PARSER_VERSION)
+            else:
+                skip = None
+                fingerprints = None
+                validators = None
+            curr_tasks.put((league, season, skip, fingerprints, validators))
+        curr_tasks.put(None)
+
+    # Pooled connections of sessions (see scraping.polish.get_session) would
+    # be shared by the forked workers and this process
+    spl.close_sessions()
+    procs = list(ctx.Process(target=_backfill_worker,
+                             args=(x, results, workers, chunk_size,
+                                   cache_dir, cache_mode))
+                 for x in tasks)
+    for proc in procs:
+        proc.start()
+
+    failed = list()
+    inserted = dict()
+    finished = set()
+    done = 0
+    draining = False
+    try:
+        while done < len(pairs):
+            try:
+                if draining:
+                    message, league, season, content = results.get_nowait()
+                else:
+                    message, league, season, content = results.get(
+                        timeout=10)
+            except queue.Empty:
+                if draining:
+                    break
+                # Workers which died without reporting leave their pairs
+                # undone, messages they put before exiting are read first
+                draining = not any(proc.is_alive() for proc in procs)
+                continue
+
+            if message == 'chunk':
+                rows_aff = dbt.bulk_insert(engine, content, ignore=True,
+                                           pragmas=pragmas)
+                curr = inserted.setdefault((league, season), dict())
+                for tab in rows_aff.keys():
+                    curr[tab] = curr.get(tab, 0) + rows_aff[tab]
+                continue
+
+            if message == 'metrics':
+                metrics.merge(content)
+                continue
+
+            done += 1
+            finished.add((league, season))
+            if message == 'error':
+                print('Failed {league}: {season}: {error}'.format(
+                    league=league,
+                    season=season,
+                    error=content))
+                failed.append((league, season, content))
+                continue
+
+            print('Inserted {league}: {start}/{end}...'.format(
+                league=league,
+                start=season,
+                end=season + 1))
+            print_inserted(inserted.pop((league, season), dict()))
+    except BaseException:
+        # Workers blocked on the full results queue would never finish
+        for proc in procs:
+            proc.terminate()
+        raise
+    finally:
+        for proc in procs:
+            proc.join()
+
+    # Pairs of workers which died (e.g. killed when out of memory) are never
+    # reported, they failed as well
+    exitcodes = list(proc.exitcode for proc in procs if proc.exitcode != 0)
+    for league, season in pairs:
+        if (league, season) in finished:
+            continue
+
+        error = 'Worker died (exit codes: {codes})'.format(codes=exitcodes)
+        print('Failed {league}: {season}: {error}'.format(league=league,
+                                                          season=season,
+                                                          error=error))
+        failed.append((league, season, error))
+
+    return failed
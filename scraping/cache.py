@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+import requests
+
+
+def cache_path(cache_dir, url):
+    """
+    Returns a path of a cached page, addressed by a hash of its URL.
+    """
+
+    key = hashlib.sha256(url.encode()).hexdigest()
+    rslt = os.path.join(cache_dir, key[:2], key + '.gz')
+    return rslt
+
+
+def write(cache_dir, url, req=None, error=None):
+    """
+    Saves a response (or a name of an error raised instead) for a given URL
+    as a compressed file. The file is replaced atomically, so concurrent
+    writers and readers never see partial content.
+    """
+
+    path = cache_path(cache_dir, url)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    header = {'url': url, 'error': error}
+    content = b''
+    if req is not None:
+        header['final_url'] = req.url
+        header['status'] = req.status_code
+        header['headers'] = dict(req.headers)
+        content = req.content
+
+    tmp_path = '{path}.{pid}.{tid}.tmp'.format(path=path,
+                                               pid=os.getpid(),
+                                               tid=threading.get_ident())
+    with gzip.open(tmp_path, 'wb') as file:
+        file.write(json.dumps(header).encode() + b'\n')
+        file.write(content)
+    os.replace(tmp_path, path)
+
+
+def read(cache_dir, url):
+    """
+    Reads a cached response for a given URL, returns None if it is missing.
+    Cached errors are raised again (only requests.TooManyRedirects is stored).
+    """
+
+    path = cache_path(cache_dir, url)
+    try:
+        with gzip.open(path, 'rb') as file:
+            header = json.loads(file.readline())
+            content = file.read()
+    except FileNotFoundError:
+        return None
+
+    if header['error'] == 'TooManyRedirects':
+        raise requests.TooManyRedirects('Cached: ' + url)
+
+    rslt = requests.models.Response()
+    rslt._content = content
+    rslt.url = header['final_url']
+    rslt.status_code = header['status']
+    rslt.headers.update(header['headers'])
+    return rslt
+
+
+def evict(cache_dir, max_size=None, max_age=None):
+    """
+    Removes cached pages older than max_age (seconds) and then the oldest ones
+    until the total size is below max_size (bytes). Returns the number of
+    removed files.
+    """
+
+    files = list()
+    for root, _, names in os.walk(cache_dir):
+        for name in names:
+            if name.endswith('.gz'):
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                files.append((stat.st_mtime, stat.st_size, path))
+    files.sort()
+
+    now = time.time()
+    total = sum(x[1] for x in files)
+    removed = 0
+    for mtime, size, path in files:
+        too_old = max_age is not None and now - mtime > max_age
+        too_big = max_size is not None and total > max_size
+        if not (too_old or too_big):
+            continue
+
+        os.remove(path)
+        total -= size
+        removed += 1
+
+    return removed
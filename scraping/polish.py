@@ -1,39 +1,356 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from lxml import html
+from lxml import html, etree
+from lxml.cssselect import CSSSelector
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlsplit
+from urllib3.util.retry import Retry
 import requests
+import threading
+import hashlib
+import time
 import re
 import numpy as np
 import pandas as pd
 import vsutils as vsu
+import vsutils.metrics as metrics
+import scraping.cache as cache
 from datetime import datetime, date
 
 
+# Maximum number of simultaneous requests sent to a single host
+# (plusliga.pl, tauronliga.pl, tauron1liga.pl), regardless of the number
+# of workers used by the batch functions
+HOST_LIMIT = 4
+
+# Base URLs of leagues' websites, see url_league (e.g. replaced by a local
+# stand-in in benchmarks/loadtest.py)
+SITES = {'PlusLiga': 'https://www.plusliga.pl',
+         'Tauron Liga': 'https://www.tauronliga.pl',
+         'Tauron 1. Liga': 'https://www.tauron1liga.pl'}
+
+# Request settings: timeout as (connect, read) in seconds, number of retries
+# for connection errors and server-side failures, and the backoff factor
+# (sleeps of backoff * 2 ** (retry - 1) seconds between attempts)
+REQUEST_TIMEOUT = (5, 30)
+REQUEST_RETRIES = 3
+REQUEST_BACKOFF = 0.5
+
+_host_semaphores = dict()
+_host_semaphores_lock = threading.Lock()
+
+_sessions = dict()
+_sessions_lock = threading.Lock()
+
+# Raw page cache, see set_cache
+_cache = {'dir': None, 'mode': None}
+
+# Version of the parsers, to be increased with every change of their output.
+# It is a part of fingerprints and stored with validators of pages, so pages
+# parsed by an older version are parsed again (see iter_fetch_all).
+PARSER_VERSION = 1
+
+# Elements read by the parsers from pages of a kind (names of SELECTORS),
+# fingerprints are computed only from them (see page_fingerprint)
+FINGERPRINT_ROOTS = {
+    'player_info': ['player_metrics', 'player_team', 'player_name'],
+    'team_info': ['team_players', 'team_name'],
+    'match_info': ['match_teams', 'match_date', 'match_details',
+                   'match_place', 'match_stats', 'match_scores']}
+
+
+# Columns of match information tables (dbtools.schema matches_info), in
+# a fixed order whichever details pages of a batch have (see
+# match_info_frame)
+MATCH_INFO_COLUMNS = ['League', 'Season', 'MatchID', 'Home', 'Away', 'Date',
+                      'Stage', 'Round', 'MatchNumber', 'MVP', 'Spectators',
+                      'FirstReferee', 'SecondReferee', 'Commissioner',
+                      'InspectorReferee', 'Arena', 'Address', 'City',
+                      'ArenaSize']
+
+
+# %% Selectors
+# CSS selectors used by the parsers, translated to XPath once at import,
+# called as SELECTORS[name](element) (same as element.cssselect(css))
+_selectors_css = {
+    'players_links': 'div.caption > h3 > a',
+    'player_metrics': ' > '.join(['div.pagecontent:nth-child(1)',
+                                  'div:nth-child(1)',
+                                  'div:nth-child(1) span']),
+    'player_team': '.playerteamname > a:nth-child(1)',
+    'player_name': '.playername',
+    'teams_links': 'div.thumbnail.teamlist > a',
+    'team_players': 'div.player-item.to-filter.cut-paste > a',
+    'team_info': 'div.col-sm-12 > div.pagecontent > div.row',
+    'team_name': 'div > h1',
+    'matches_links': 'div.gameresult.clickable',
+    'match_teams': 'div.col-xs-4.col-sm-3.tablecell > h2 > a',
+    'match_date': 'div.col-xs-4.col-sm-2.tablecell > div.date.khanded',
+    'match_details': 'div.col-sm-6.col-md-5 > table',
+    'match_place': 'div.pagecontent > table.right-left.spacced',
+    'match_stats': 'table.rs-standings-table',
+    'match_scores': 'table[id^="gameScore_"]',
+    'a': 'a',
+    'p': 'p',
+    'tr': 'tr',
+    'th': 'th',
+    'td': 'td',
+    'td_span': 'td > span',
+    'thead': 'thead',
+    'tbody': 'tbody',
+    'stats_players': 'th.min-responsive > a'}
+
+SELECTORS = {name: CSSSelector(css, translator='html')
+             for name, css in _selectors_css.items()}
+
+# Results table has a match-specific ID, passed as a variable:
+# SELECTORS['match_score'](tree, id='gameScore_' + str(ID))
+SELECTORS['match_score'] = etree.XPath(
+    "descendant-or-self::table[@id = $id]")
+
+
 # %% Tools
 def url_league(league, *args):
     """
     Creates a basic URL for a given league
     """
 
-    sites = {'PlusLiga': 'https://www.plusliga.pl',
-             'Tauron Liga': 'https://www.tauronliga.pl',
-             'Tauron 1. Liga': 'https://www.tauron1liga.pl'}
-    rslt = [sites[league], *args]
+    rslt = [SITES[league], *args]
     rslt = '/'.join(str(x) for x in rslt) + '.html'
     return rslt
 
 
-def make_request(url):
+def _host_semaphore(url):
+    """
+    Returns a semaphore limiting concurrent requests to the host of the URL.
+    """
+
+    host = urlsplit(url).netloc
+    with _host_semaphores_lock:
+        if host not in _host_semaphores:
+            _host_semaphores[host] = threading.BoundedSemaphore(HOST_LIMIT)
+
+    return _host_semaphores[host]
+
+
+def get_session(url):
     """
-    Makes a request with a proper encoding.
+    Returns a keep-alive session shared by all requests to the host of the URL.
+    Its connection pool matches HOST_LIMIT, failed connections and 429/5xx
+    responses are retried with an exponential backoff. Redirects are not
+    retried, too many of them raise requests.TooManyRedirects.
+    """
+
+    host = urlsplit(url).netloc
+    with _sessions_lock:
+        if host not in _sessions:
+            retry = Retry(total=REQUEST_RETRIES,
+                          redirect=False,
+                          backoff_factor=REQUEST_BACKOFF,
+                          status_forcelist=[429, 500, 502, 503, 504],
+                          allowed_methods=['GET'])
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1,
+                                                    pool_maxsize=HOST_LIMIT,
+                                                    max_retries=retry)
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _sessions[host] = session
+
+    return _sessions[host]
+
+
+def close_sessions():
     """
+    Closes all sessions and their pooled connections.
+    """
+
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def set_cache(cache_dir=None, mode='read'):
+    """
+    Sets up a compressed on-disk cache of raw pages used by make_request.
+    Modes:
+        'read' - pages are served from the cache, missing ones are downloaded
+                 and stored (suitable for closed seasons),
+        'write' - pages are always downloaded and stored (current season),
+        'replay' - pages are served only from the cache, a missing page
+                   raises LookupError (offline re-parsing).
+    No cache_dir disables the cache.
+    """
+
+    if mode not in ['read', 'write', 'replay']:
+        raise ValueError(mode)
+
+    _cache['dir'] = cache_dir
+    _cache['mode'] = mode
+
+
+def _response_validators(req):
+    """
+    Returns validators of a response as an (ETag, Last-Modified) pair,
+    None if the host did not send any.
+    """
+
+    rslt = (req.headers.get('ETag'), req.headers.get('Last-Modified'))
+    if rslt == (None, None):
+        return None
+    return rslt
+
+
+def make_request(url, timeout=None, allow_redirects=True, validators=None):
+    """
+    Makes a request with a proper encoding, using a pooled session of the
+    host and the page cache (see set_cache). Timeout defaults to
+    REQUEST_TIMEOUT. Without allow_redirects, a redirect response is
+    returned as it is (req.is_redirect), its target is not downloaded.
+    Validators can map URLs to (ETag, Last-Modified) pairs of pages stored
+    before, the request of such a URL is conditional and a page not modified
+    since is returned as a 304 response without any content (not cached).
+    Validators of downloaded pages are stored there, pages of hosts which
+    do not send any are always downloaded in full.
+    Pages read from the cache and downloaded ones are recorded as
+    'request.cache' and 'request.network' metrics (the latter without waiting
+    for the host's semaphore), not modified ones also as
+    'request.not_modified'. Failed requests are recorded as 'request.error'
+    (including their retries), requests retried before they succeeded
+    as 'request.retry' with the number of retries as rows.
+    """
+
+    if timeout is None:
+        timeout = REQUEST_TIMEOUT
+
+    cache_dir = _cache['dir']
+    if cache_dir is not None and _cache['mode'] in ['read', 'replay']:
+        with metrics.timer('request.cache') as counts:
+            req = cache.read(cache_dir, url)
+            if req is not None:
+                counts['bytes'] = len(req.content)
+        if req is not None:
+            req.encoding = 'Latin-2'
+            return req
+        if _cache['mode'] == 'replay':
+            raise LookupError('Page not cached: ' + url)
+
+    headers = dict()
+    if validators is not None and validators.get(url) is not None:
+        etag, modified = validators[url]
+        if etag is not None:
+            headers['If-None-Match'] = etag
+        if modified is not None:
+            headers['If-Modified-Since'] = modified
+
+    try:
+        with _host_semaphore(url):
+            start = time.perf_counter()
+            try:
+                with metrics.timer('request.network') as counts:
+                    req = get_session(url).get(url, timeout=timeout,
+                                               allow_redirects=allow_redirects,
+                                               headers=headers)
+                    counts['bytes'] = len(req.content)
+            except requests.RequestException:
+                metrics.record('request.error', time.perf_counter() - start)
+                raise
+    except requests.TooManyRedirects:
+        if cache_dir is not None:
+            cache.write(cache_dir, url, error='TooManyRedirects')
+        raise
+
+    # Retries of the session (see get_session) are part of request.network
+    retries = getattr(req.raw, 'retries', None)
+    if retries is not None and len(retries.history) > 0:
+        metrics.record('request.retry', 0.0, rows=len(retries.history))
+
+    if req.status_code == 304:
+        metrics.record('request.not_modified', 0.0)
+        return req
+
+    if validators is not None and req.status_code == 200:
+        curr = _response_validators(req)
+        if curr is None:
+            validators.pop(url, None)
+        else:
+            validators[url] = curr
+
+    if cache_dir is not None:
+        cache.write(cache_dir, url, req)
 
-    req = requests.get(url)
     req.encoding = 'Latin-2'
     return req
 
 
+def page_fingerprint(tree, kind):
+    """
+    Returns a fingerprint of a page (lxml tree) of a kind: a hash of
+    PARSER_VERSION and the elements its parsers read (FINGERPRINT_ROOTS),
+    so changes of the rest of the page (e.g. scripts, banners or tokens)
+    do not change it.
+    """
+
+    parts = [str(PARSER_VERSION).encode()]
+    for name in FINGERPRINT_ROOTS[kind]:
+        parts.extend(etree.tostring(x, with_tail=False)
+                     for x in SELECTORS[name](tree))
+
+    rslt = hashlib.md5(b' '.join(parts))
+    return rslt.hexdigest()
+
+
+def _not_modified(req):
+    """
+    Checks if a page was not modified since its validators were stored
+    (a 304 response, see make_request).
+    """
+
+    if req.status_code != 304:
+        return False
+
+    metrics.record('parse.unchanged', 0.0)
+    return True
+
+
+def _unchanged(url, tree, kind, fingerprints):
+    """
+    Checks if a page (lxml tree) of a kind has the same fingerprint as in
+    fingerprints (a dict of URLs to fingerprints, see iter_fetch_all),
+    otherwise its new fingerprint is stored there.
+    """
+
+    if fingerprints is None:
+        return False
+
+    curr = page_fingerprint(tree, kind)
+    if fingerprints.get(url) == curr:
+        metrics.record('parse.unchanged', 0.0)
+        return True
+
+    fingerprints[url] = curr
+    return False
+
+
+def batch_map(func, combinations, workers=1):
+    """
+    Runs func for every row of combinations and returns a list of results
+    in the order of rows. For workers > 1 rows are processed by a thread pool,
+    with requests to each host limited by HOST_LIMIT.
+    """
+
+    if workers is None or workers <= 1:
+        return list(func(*x) for x in combinations.values)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        rslt = list(executor.map(lambda x: func(*x), combinations.values))
+
+    return rslt
+
+
 def extract_ids(strings):
     """
     Extracts Player/Team IDs from URLs
@@ -142,10 +459,12 @@ def fetch_players(league, season):
 
     url = url_league(league, 'players/tour', season)
     req = make_request(url)
-    tree = html.fromstring(req.text)
+    with metrics.timer('parse.players_list') as counts:
+        tree = html.fromstring(req.text)
 
-    links = tree.cssselect('div.caption > h3 > a')
-    ids = extract_ids(list(x.get('href') for x in links))
+        links = SELECTORS['players_links'](tree)
+        ids = extract_ids(list(x.get('href') for x in links))
+        counts['rows'] = len(ids)
 
     rslt = pd.DataFrame({'League': league,
                          'Season': season,
@@ -154,54 +473,74 @@ def fetch_players(league, season):
     return rslt
 
 
-def fetch_player_info(league, season, ID):
+def fetch_player_info(league, season, ID, fingerprints=None,
+                      validators=None):
     """
     Scraps information about a player with a given league, ID and season.
     Lower level function for a single combination of those factors,
-    accesses a corresponding website once.
+    accesses a corresponding website once. Returns None if the page did not
+    change (see _not_modified and _unchanged).
     """
     # NOTE: I'd prefer ID to be lowercase, however that is already a Python
     # function, maybe consider some other naming or keep it as it is
 
-    info = [league, season, ID]
     url = url_league(league, 'players/tour', season, 'id', ID)
 
     # Sometimes a player's info page is broken, happens to Alan Sket (2100352)
-    # Results in too many redirects, return without info in this case
+    # Results in too many redirects (in pages cached when redirects were
+    # followed), return without info in this case
+    # Other errors are raised after retries in make_request
     try:
-        req = make_request(url)
-    except:
+        req = make_request(url, allow_redirects=False, validators=validators)
+    except requests.TooManyRedirects:
         return []
 
+    if _not_modified(req):
+        return None
+
     # Website redirects links for seasons a player did not take part in
-    # to the newest season -- checked and empty list returned here
-    if req.url != url:
+    # to the newest season -- checked and empty list returned here, without
+    # downloading the newest season's page (see iter_fetch_all for players
+    # whose pages are skipped later on)
+    if req.is_redirect or req.url != url:
         return []
 
-    tree = html.fromstring(req.text)
-    selector = ' > '.join(['div.pagecontent:nth-child(1)',
-                           'div:nth-child(1)',
-                           'div:nth-child(1) span'])
-    metrics = tree.cssselect(selector)
-    team = tree.cssselect('.playerteamname > a:nth-child(1)')
-    name = tree.cssselect('.playername')[0].text
+    with metrics.timer('parse.player_info') as counts:
+        tree = html.fromstring(req.text)
+        if _unchanged(url, tree, 'player_info', fingerprints):
+            return None
+        rslt = parse_player_info(tree, league, season, ID)
+        counts['rows'] = 1
+    return rslt
+
 
-    metrics = list(i.text for i in metrics)
-    for i in range(len(metrics)):
-        if metrics[i] is not None:
-            metrics[i] = metrics[i].strip()
+def parse_player_info(tree, league, season, ID):
+    """
+    Parses a player's page (lxml tree) into a list of values, see
+    fetch_player_info.
+    """
+
+    info = [league, season, ID]
+    player_metrics = SELECTORS['player_metrics'](tree)
+    team = SELECTORS['player_team'](tree)
+    name = SELECTORS['player_name'](tree)[0].text
 
-    metrics[0] = team[0].get('href')
+    player_metrics = list(i.text for i in player_metrics)
+    for i in range(len(player_metrics)):
+        if player_metrics[i] is not None:
+            player_metrics[i] = player_metrics[i].strip()
+
+    player_metrics[0] = team[0].get('href')
 
     # Sometimes data is unavailable (especially Reach for liberos),
     # empty string crashes later functions
     # TODO: There must be a better, more robust way to do this
-    for index, value in enumerate(metrics):
+    for index, value in enumerate(player_metrics):
         if value == '':
-            metrics[index] = None
+            player_metrics[index] = None
 
     info.append(name)
-    info.extend(metrics)
+    info.extend(player_metrics)
 
     # TODO: Player's team history table is available under the same URL,
     # it should be considered to add it here
@@ -210,15 +549,29 @@ def fetch_player_info(league, season, ID):
     return info
 
 
-def batch_fetch_player_info(combinations):
+def batch_fetch_player_info(combinations, workers=1, fingerprints=None,
+                            validators=None, unchanged=None):
     """
     Runs a lower level function for all combinations and prepares a pd.DataFrame
-    with correct data formatting.
+    with correct data formatting. Pages are fetched by the given number of
+    workers, see batch_map.
+    Pages which did not change (not modified since their validators were
+    stored, or with the same fingerprints) are left out, see _not_modified
+    and _unchanged. IDs of their players are added to unchanged (a set),
+    so they can be told from redirected ones.
     """
     # TODO: The interface should be reviewed here, simply a draft below
     # Maybe it can be done a little bit smarter
     combinations = combinations.loc[:, ['League', 'Season', 'PlayerID']]
-    rslt = list(fetch_player_info(*x) for x in combinations.values)
+    rslt = batch_map(partial(fetch_player_info, fingerprints=fingerprints,
+                             validators=validators),
+                     combinations, workers=workers)
+    if unchanged is not None:
+        unchanged.update(ID for ID, x in zip(combinations.PlayerID, rslt)
+                         if x is None)
+    # Redirected pages give empty lists, a batch of only those would not
+    # fit the columns
+    rslt = list(x for x in rslt if x is not None and len(x) > 0)
 
     rslt = pd.DataFrame(rslt, columns=['League', 'Season', 'PlayerID',
                                        'PlayerName', 'TeamID', 'DateOfBirth',
@@ -252,10 +605,12 @@ def fetch_teams(league, season):
 
     url = url_league(league, 'teams/tour', season)
     req = make_request(url)
-    tree = html.fromstring(req.text)
+    with metrics.timer('parse.teams_list') as counts:
+        tree = html.fromstring(req.text)
 
-    links = tree.cssselect('div.thumbnail.teamlist > a')
-    ids = extract_ids(list(x.get('href') for x in links))
+        links = SELECTORS['teams_links'](tree)
+        ids = extract_ids(list(x.get('href') for x in links))
+        counts['rows'] = len(ids)
 
     rslt = pd.DataFrame({'League': league,
                          'Season': season,
@@ -266,19 +621,37 @@ def fetch_teams(league, season):
 
 def _parse_teaminfo_table(tab):
     ## TODO: Finish, does not work at the moment
-    pars = tab.cssselect('p')
+    pars = SELECTORS['p'](tab)
     texts = list(''.join(par.itertext()) for par in pars)
     texts = list(re.split(pattern=r'[\n\t\r]+', string=txt) for txt in texts)
 
     return None
 
 
-def fetch_team_info(league, season, ID):
+def fetch_team_info(league, season, ID, fingerprints=None, validators=None):
     url = url_league(league, 'teams/id', ID, 'tour', season)
     # TODO: Finish, consider what should be returned (name, roster, something else?)
 
-    req = make_request(url)
-    tree = html.fromstring(req.text)
+    # Pages not modified or with known fingerprints are not parsed at all,
+    # see _not_modified and _unchanged
+    req = make_request(url, validators=validators)
+    if _not_modified(req):
+        return None
+
+    with metrics.timer('parse.team_info') as counts:
+        tree = html.fromstring(req.text)
+        if _unchanged(url, tree, 'team_info', fingerprints):
+            return None
+        rslt = parse_team_info(tree, league, season, ID)
+        counts['rows'] = 1
+    return rslt
+
+
+def parse_team_info(tree, league, season, ID):
+    """
+    Parses a team's page (lxml tree) into information and roster tables,
+    see fetch_team_info.
+    """
 
     ids = pd.DataFrame([{'League': league,
                          'Season': season,
@@ -287,7 +660,7 @@ def fetch_team_info(league, season, ID):
                       'TeamID': np.int64})
 
     # Roster ------------------------------------------------------------------
-    players = tree.cssselect('div.player-item.to-filter.cut-paste > a')
+    players = SELECTORS['team_players'](tree)
     players = extract_ids(list(p.get('href') for p in players))
     players = pd.DataFrame(players, columns=['PlayerID'])
     players = vsu.df_colattach1(ids, players)
@@ -295,10 +668,10 @@ def fetch_team_info(league, season, ID):
 
     # Information -------------------------------------------------------------
     ## TODO: Finish this
-    info = tree.cssselect('div.col-sm-12 > div.pagecontent > div.row')[0]
+    info = SELECTORS['team_info'](tree)[0]
     # info = _parse_teaminfo_table(info)
 
-    team_name = tree.cssselect('div > h1')[0]
+    team_name = SELECTORS['team_name'](tree)[0]
     info = ids.copy()
     info['TeamName'] = team_name.text
 
@@ -309,19 +682,33 @@ def fetch_team_info(league, season, ID):
     return rslt
 
 
-def batch_fetch_team_info(combinations):
+def batch_fetch_team_info(combinations, workers=1, fingerprints=None,
+                          validators=None):
     """
     Runs a lower level function for all combinations and concatenates DataFrames.
+    Pages are fetched by the given number of workers, see batch_map.
+    Pages which did not change (not modified since their validators were
+    stored, or with the same fingerprints) are left out, see _not_modified
+    and _unchanged.
     """
     # TODO: The interface should be reviewed here, simply a draft below
     # Maybe it can be done a little bit smarter
     combinations = combinations.loc[:, ['League', 'Season', 'TeamID']]
-    data = list(fetch_team_info(*x) for x in combinations.values)
+    data = batch_map(partial(fetch_team_info, fingerprints=fingerprints,
+                             validators=validators),
+                     combinations, workers=workers)
+    data = list(x for x in data if x is not None)
 
+    # Keys listed explicitly, so that an empty batch returns empty lists
     rslt = dict()
-    for key in data[0].keys():
-       rslt[key] = pd.concat(list(x[key] for x in data),
-                             ignore_index=True)
+    for key in ['information', 'roster']:
+       tables = list(x[key] for x in data if len(x[key]) > 0)
+
+       if len(tables) > 0:
+           rslt[key] = pd.concat(tables,
+                                 ignore_index=True)
+       else:
+           rslt[key] = list()
 
     return rslt
 
@@ -343,10 +730,12 @@ def fetch_matches(league, season):
 
     url = url_league(league, 'games/tour', season)
     req = make_request(url)
-    tree = html.fromstring(req.text)
+    with metrics.timer('parse.matches_list') as counts:
+        tree = html.fromstring(req.text)
 
-    links = tree.cssselect('div.gameresult.clickable')
-    ids = extract_ids(list(x.get('onclick') for x in links))
+        links = SELECTORS['matches_links'](tree)
+        ids = extract_ids(list(x.get('onclick') for x in links))
+        counts['rows'] = len(ids)
 
     rslt = pd.DataFrame({'League': league,
                          'Season': season,
@@ -359,22 +748,28 @@ def fetch_matches(league, season):
     return rslt
 
 
-def _parse_stats_table(tab, season):
-    head = tab.cssselect('thead')[0]
-    body = tab.cssselect('tbody')[0]
+def _extract_stats_table(tab, season):
+    """
+    Extracts raw values of a statistics table: a dict of columns (lists
+    of strings, PlayerID links first) and a flag of the old (2008-2019)
+    format. Returns None for seasons in an unknown format.
+    """
+
+    head = SELECTORS['thead'](tab)[0]
+    body = SELECTORS['tbody'](tab)[0]
 
     # Get PlayerIDs
     player_ids = list(a.get('href')
-                      for a in body.cssselect('th.min-responsive > a'))
+                      for a in SELECTORS['stats_players'](body))
 
     # Get header row with column names
     # Second row chosen, as first are pasted column names
-    header_cols = head.cssselect('tr')[1]
-    header_cols = list(row.text for row in header_cols.cssselect('th'))
+    header_cols = SELECTORS['tr'](head)[1]
+    header_cols = list(row.text for row in SELECTORS['th'](header_cols))
 
     # Get contents of the table
-    rows = body.cssselect('tr')
-    values = list(list(val.text for val in rows[i].cssselect('td'))
+    rows = SELECTORS['tr'](body)
+    values = list(list(val.text for val in SELECTORS['td'](rows[i]))
                   for i in range(len(rows) - 1))  # Last row is skipped as it is a total
 
     # Prepare table headers
@@ -412,10 +807,21 @@ def _parse_stats_table(tab, season):
     # Final list of column names
     all_cols = set_cols + other_cols
 
+    columns = {'PlayerID': player_ids}
+    for i, col in enumerate(all_cols):
+        columns[col] = list(row[i] for row in values)
+
+    return columns, old_format
+
+
+def _stats_frame(columns, old_format):
+    """
+    Builds a statistics table with correct types from raw columns
+    (see _extract_stats_table), possibly gathered from many tables.
+    """
+
     # Prepare a data frame
-    rslt = pd.DataFrame(values,
-                        columns=all_cols)
-    rslt.insert(loc=0, column='PlayerID', value=player_ids)
+    rslt = pd.DataFrame(columns)
 
     # Change column types
     rslt.PlayerID = extract_ids(rslt.PlayerID)
@@ -469,25 +875,48 @@ def _parse_stats_table(tab, season):
     return rslt
 
 
-def _parse_details_table(tab):
-    labels = tab.cssselect('td')
+def _parse_stats_table(tab, season):
+    raw = _extract_stats_table(tab, season)
+    if raw is None:
+        return None
+
+    rslt = _stats_frame(*raw)
+    return rslt
+
+
+def _extract_details_table(tab):
+    """
+    Extracts raw values of a details table into a dict with translated labels.
+    """
+
+    labels = SELECTORS['td'](tab)
     labels = list(x.text[:-1] for x in labels if x.text is not None)
     labels = translate_terms(labels)
 
-    values = tab.cssselect('td > span')
+    values = SELECTORS['td_span'](tab)
     values = list(x.text for x in values)
 
     rslt = dict(zip(labels, values))
     if 'MVP' in labels:
-        rslt['MVP'] = extract_ids([tab.cssselect('a')[0].get('href')])
+        rslt['MVP'] = extract_ids([SELECTORS['a'](tab)[0].get('href')])[0]
+
+    return rslt
+
+
+def _details_types(rslt):
+    """
+    Sets types of details columns, possibly gathered from many tables.
+    Integer columns are nullable, so their types do not depend on missing
+    values of other matches.
+    """
 
-    rslt = pd.DataFrame([rslt])
     types = {# 'Round': np.int32,
              # 'MatchNumber': np.int32, (Matches are number using letters in playoffs)
-             'MVP': np.int64,
-             'Spectators': np.int32,
+             'MVP': pd.Int64Dtype(),
+             'Spectators': pd.Int32Dtype(),
              'ArenaSize': pd.Int32Dtype()} # There are sometimes NAs in old data
-    rslt = rslt.astype({k: v for k, v in types.items() if k in rslt.columns})
+    types = {k: v for k, v in types.items() if k in rslt.columns}
+    rslt = rslt.astype(types)
 
     if 'Stage' in rslt.columns:
         rslt.Stage = translate_terms(rslt.Stage)
@@ -495,14 +924,52 @@ def _parse_details_table(tab):
     return rslt
 
 
-def _parse_results_table(tab):
-    rows = tab.cssselect('tr')
+def match_info_frame(info):
+    """
+    Reindexes information about matches to MATCH_INFO_COLUMNS with fixed
+    types. Columns which none of the matches has are left empty, so a match
+    gets the same row (and hash) whichever matches it is parsed with. Also
+    used to hash stored rows again (see pipeline.rehash_matches_info).
+    """
+
+    types = {k: object for k in MATCH_INFO_COLUMNS if k not in info.columns}
+    types.update({'Season': np.int32,
+                  'MatchID': np.int64,
+                  'Home': np.int64,
+                  'Away': np.int64,
+                  'Date': 'datetime64[ns]',
+                  'MVP': pd.Int64Dtype(),
+                  'Spectators': pd.Int32Dtype(),
+                  'ArenaSize': pd.Int32Dtype()})
+
+    rslt = info.reindex(columns=MATCH_INFO_COLUMNS)
+    rslt = rslt.astype(types)
+    return rslt
+
+
+def _parse_details_table(tab):
+    rslt = pd.DataFrame([_extract_details_table(tab)])
+    rslt = _details_types(rslt)
+    return rslt
+
+
+def _extract_results_table(tab):
+    """
+    Extracts rows of a results table, without headers and the total.
+    """
+
+    rows = SELECTORS['tr'](tab)
 
     # Discard first (headers)
     rows = rows[1:]
     values = list([x.text for x in row] for row in rows)
+    values = list(x for x in values if x[0] != 'Łącznie')
+    return values
+
+
+def _parse_results_table(tab):
+    values = _extract_results_table(tab)
     rslt = pd.DataFrame(values, columns=['Set', 'Time', 'Points', 'Result'])
-    rslt = rslt[rslt.Set != 'Łącznie']
 
     # Fix the set number
     n = rslt.shape[0]
@@ -512,13 +979,55 @@ def _parse_results_table(tab):
     return rslt
 
 
+def _match_date(tree):
+    date = SELECTORS['match_date'](tree)
+    date = date[0].text.strip()
+    ## TODO: Make this more robust
+    if len(date) == (10 + 2 + 5):
+        date = datetime.strptime(date, '%d.%m.%Y, %H:%M')
+    elif len(date) == 10:
+        date = datetime.strptime(date, '%d.%m.%Y')
+    else:
+        date = None
+    date = np.datetime64(date, 's')
+    return date
+
+
+def _match_teams(tree):
+    teams = SELECTORS['match_teams'](tree)
+    teams = list(x.get('href') for x in teams)
+    teams = extract_ids(teams)
+
+    # If there was no ID to extract (i.e. it is not yet known who will play),
+    # provide fake IDs
+    ## TODO: Make this more robust
+    if len(teams) != 2:
+        teams = np.array([0, 0], dtype=np.int64)
+
+    return teams
+
+
 def fetch_match_info(league, season, ID):
     # TODO: Finish, consider what should be returned (teams, result, time,
     # place, something else?)
+    tree = _fetch_match_tree(league, season, ID)
+    rslt = parse_match_info(tree, league, season, ID)
+    return rslt
+
+
+def _fetch_match_tree(league, season, ID):
     url = url_league(league, 'games/id', ID, 'tour', season)
 
     req = make_request(url)
     tree = html.fromstring(req.text)
+    return tree
+
+
+def parse_match_info(tree, league, season, ID):
+    """
+    Parses a match page (lxml tree) into information, results and statistics
+    tables, see fetch_match_info.
+    """
 
     ids = pd.DataFrame([{'League': league,
                          'Season': season,
@@ -527,32 +1036,14 @@ def fetch_match_info(league, season, ID):
                       'MatchID': np.int64})
 
     # Information -------------------------------------------------------------
-    teams = tree.cssselect('div.col-xs-4.col-sm-3.tablecell > h2 > a')
-    teams = list(x.get('href') for x in teams)
-    teams = extract_ids(teams)
-
-    # If there was no ID to extract (i.e. it is not yet known who will play),
-    # provide fake IDs
-    ## TODO: Make this more robust
-    if len(teams) != 2:
-        teams = np.array([0, 0], dtype=np.int64)
-
+    teams = _match_teams(tree)
     teams = pd.DataFrame(teams.reshape(1, 2),
                          columns=['Home', 'Away'])
 
-    date = tree.cssselect('div.col-xs-4.col-sm-2.tablecell > div.date.khanded')
-    date = date[0].text.strip()
-    ## TODO: Make this more robust
-    if len(date) == (10 + 2 + 5):
-        date = datetime.strptime(date, '%d.%m.%Y, %H:%M')
-    elif len(date) == 10:
-        date = datetime.strptime(date, '%d.%m.%Y')
-    else:
-        date = None
-    date = np.datetime64(date, 's')
+    date = _match_date(tree)
 
-    details = tree.cssselect('div.col-sm-6.col-md-5 > table')
-    place = tree.cssselect('div.pagecontent > table.right-left.spacced')
+    details = SELECTORS['match_details'](tree)
+    place = SELECTORS['match_place'](tree)
     details = list(_parse_details_table(tab) for tab in details + place)
     if len(details) > 0:
         details = pd.concat(details, axis=1)
@@ -561,9 +1052,10 @@ def fetch_match_info(league, season, ID):
         details = pd.DataFrame([date], columns=['Date'])
 
     details = pd.concat([ids, teams, details], axis=1)
+    details = match_info_frame(details)
 
     # Statistics --------------------------------------------------------------
-    stat_tabs = tree.cssselect('table.rs-standings-table')
+    stat_tabs = SELECTORS['match_stats'](tree)
 
     if len(stat_tabs) == 2:
         stats_home = _parse_stats_table(stat_tabs[0],
@@ -582,7 +1074,7 @@ def fetch_match_info(league, season, ID):
         stats = []
 
     # Results -----------------------------------------------------------------
-    rslt_tab = tree.cssselect('table#gameScore_' + str(ID))
+    rslt_tab = SELECTORS['match_score'](tree, id='gameScore_' + str(ID))
     if len(rslt_tab) > 0:
         results = _parse_results_table(rslt_tab[0])
         results = vsu.df_colattach1(ids, results)
@@ -597,54 +1089,408 @@ def fetch_match_info(league, season, ID):
     return rslt
 
 
-def batch_fetch_match_info(combinations):
+def _extract_match_info(tree, league, season, ID):
     """
-    Runs a lower level function for all combinations and concatenates DataFrames.
+    Extracts raw values of a match page: information (a dict), results
+    (a list of rows) and statistics (a list of (TeamID, raw columns) for both
+    teams, see _extract_stats_table), to be built into tables by _match_tables.
     """
-    # TODO: The interface should be reviewed here, simply a draft below
-    # Maybe it can be done a little bit smarter
-    combinations = combinations.loc[:, ['League', 'Season', 'MatchID']]
-    data = list(fetch_match_info(*x) for x in combinations.values)
 
-    rslt = dict()
-    for key in data[0].keys():
-       tables = list(x[key] for x in data if len(x[key]) > 0)
+    teams = _match_teams(tree)
+    info = {'League': league,
+            'Season': season,
+            'MatchID': ID,
+            'Home': teams[0],
+            'Away': teams[1],
+            'Date': _match_date(tree)}
 
-       if len(tables) > 0:
-           rslt[key] = pd.concat(tables,
-                                 ignore_index=True)
-       else:
-           rslt[key] = list()
+    details = SELECTORS['match_details'](tree)
+    place = SELECTORS['match_place'](tree)
+    for tab in details + place:
+        info.update(_extract_details_table(tab))
+
+    stat_tabs = SELECTORS['match_stats'](tree)
+    if len(stat_tabs) == 2:
+        stats = [(info['Home'], _extract_stats_table(stat_tabs[0], season)),
+                 (info['Away'], _extract_stats_table(stat_tabs[1], season))]
+    else:
+        stats = []
+
+    rslt_tab = SELECTORS['match_score'](tree, id='gameScore_' + str(ID))
+    if len(rslt_tab) > 0:
+        results = _extract_results_table(rslt_tab[0])
+    else:
+        results = []
+
+    rslt = {'information': info,
+            'results': results,
+            'stats': stats}
+    return rslt
+
+
+def _fetch_match_raw(league, season, ID, fingerprints=None, validators=None):
+    url = url_league(league, 'games/id', ID, 'tour', season)
+
+    req = make_request(url, validators=validators)
+    if _not_modified(req):
+        return None
+
+    with metrics.timer('parse.match_info') as counts:
+        tree = html.fromstring(req.text)
+        if _unchanged(url, tree, 'match_info', fingerprints):
+            return None
+        rslt = _extract_match_info(tree, league, season, ID)
+        counts['rows'] = 1
+    return rslt
+
+
+def _append_columns(buffer, columns, n):
+    """
+    Appends n rows of columns (dict of lists) to a columnar buffer (dict
+    of lists). Columns missing in either of them are filled with NaN.
+    """
 
+    size = len(buffer['_row'])
+    for col, values in columns.items():
+        if col not in buffer:
+            buffer[col] = [np.nan] * size
+        buffer[col].extend(values)
+
+    for values in buffer.values():
+        if len(values) < size + n:
+            values.extend([np.nan] * n)
+
+
+def _match_tables(matches):
+    """
+    Builds information, results and statistics tables of many matches at once
+    from their raw values (see _extract_match_info). Values of all matches
+    are gathered into columns first and types are converted once per column,
+    the tables are the same as concatenated results of parse_match_info.
+    """
+
+    if len(matches) == 0:
+        return {'information': list(), 'results': list(), 'stats': list()}
+
+    # Information -------------------------------------------------------------
+    info = pd.DataFrame(list(x['information'] for x in matches))
+    info = _details_types(match_info_frame(info))
+
+    # Results -----------------------------------------------------------------
+    results = {'League': [], 'Season': [], 'MatchID': [],
+               'Set': [], 'Time': [], 'Points': [], 'Result': []}
+    for match in matches:
+        n = len(match['results'])
+        for col in ['League', 'Season', 'MatchID']:
+            results[col].extend([match['information'][col]] * n)
+        results['Set'].extend(range(1, n + 1))
+        for i, col in enumerate(['Time', 'Points', 'Result']):
+            results[col].extend(row[i + 1] for row in match['results'])
+
+    if len(results['Set']) > 0:
+        results = pd.DataFrame(results)
+        results = results.astype({'Season': np.int32,
+                                  'MatchID': np.int64,
+                                  'Set': np.int64})
+    else:
+        results = list()
+
+    # Statistics --------------------------------------------------------------
+    # Old and new formats have different columns, so each one has its buffer,
+    # _row keeps the original order of rows
+    buffers = dict()
+    row = 0
+    for match in matches:
+        for team, raw in match['stats']:
+            columns, old_format = raw
+            n = len(columns['PlayerID'])
+            ids = {'_row': range(row, row + n),
+                   'League': [match['information']['League']] * n,
+                   'Season': [match['information']['Season']] * n,
+                   'MatchID': [match['information']['MatchID']] * n,
+                   'TeamID': [team] * n}
+            buffer = buffers.setdefault(old_format, {'_row': []})
+            _append_columns(buffer, dict(ids, **columns), n)
+            row += n
+
+    stats = list()
+    order = list()
+    for old_format, buffer in buffers.items():
+        ids = {col: buffer.pop(col)
+               for col in ['_row', 'League', 'Season', 'MatchID', 'TeamID']}
+        frame = _stats_frame(buffer, old_format)
+        frame.insert(loc=0, column='TeamID',
+                     value=np.array(ids['TeamID'], dtype=np.int64))
+        frame.insert(loc=0, column='MatchID',
+                     value=np.array(ids['MatchID'], dtype=np.int64))
+        frame.insert(loc=0, column='Season',
+                     value=np.array(ids['Season'], dtype=np.int32))
+        frame.insert(loc=0, column='League',
+                     value=np.array(ids['League'], dtype=object))
+        stats.append(frame)
+        order.extend(ids['_row'])
+
+    if len(stats) > 0:
+        stats = pd.concat(stats, ignore_index=True)
+        stats = stats.iloc[np.argsort(order, kind='stable')]
+        stats = stats.reset_index(drop=True)
+
+    rslt = {'information': info,
+            'results': results,
+            'stats': stats}
+    return rslt
+
+
+def batch_fetch_match_info(combinations, workers=1, fingerprints=None,
+                           validators=None):
+    """
+    Fetches all combinations and builds tables of all matches at once
+    (see _match_tables), the same as concatenated results of fetch_match_info.
+    Pages are fetched by the given number of workers, see batch_map.
+    Pages which did not change (not modified since their validators were
+    stored, or with the same fingerprints) are left out, see _not_modified
+    and _unchanged.
+    """
+
+    combinations = combinations.loc[:, ['League', 'Season', 'MatchID']]
+    data = batch_map(partial(_fetch_match_raw, fingerprints=fingerprints,
+                             validators=validators),
+                     combinations, workers=workers)
+    data = list(x for x in data if x is not None)
+
+    with metrics.timer('build.match_info') as counts:
+        rslt = _match_tables(data)
+        counts['rows'] = len(data)
     return rslt
 
 
 # %% All
-def fetch_all(league, season):
-    tabs = dict()
-    tabs['matches_list'] = fetch_matches(league, season)
-    matches_data = batch_fetch_match_info(tabs['matches_list'])
-    tabs['matches_info'] = matches_data['information']
-    tabs['matches_stats'] = matches_data['stats']
-    tabs['matches_results'] = matches_data['results']
-
-    tabs['teams_list'] = fetch_teams(league, season)
-    teams_data = batch_fetch_team_info(tabs['teams_list'])
-    tabs['teams_info'] = teams_data['information']
-    tabs['teams_roster'] = teams_data['roster']
-
-    tabs['players_list'] = fetch_players(league, season)
+def _drop_known(tab, column, skip):
+    """
+    Drops rows with IDs listed in skip[column] (if there are any).
+    """
+
+    known = skip.get(column, set())
+    if len(known) == 0:
+        return tab
+
+    rslt = tab[~tab[column].isin(known)]
+    rslt = rslt.reset_index(drop=True)
+    return rslt
+
+
+def _chunks(tab, chunk_size):
+    """
+    Splits a pd.DataFrame into consecutive pieces of at most chunk_size rows.
+    """
+
+    for start in range(0, len(tab), chunk_size):
+        yield tab.iloc[start:(start + chunk_size)]
+
+
+def _non_empty(tabs):
+    return {k: v for k, v in tabs.items() if len(v) > 0}
+
+
+def _changed(pages, stored):
+    """
+    Returns a dict of pages (URLs to values) whose values differ from
+    the stored ones and marks them as stored.
+    """
+
+    rslt = {k: v for k, v in pages.items() if stored.get(k) != v}
+    stored.update(rslt)
+    return rslt
+
+
+def _changed_fingerprints(league, season, fingerprints, stored):
+    """
+    Returns a pd.DataFrame of fingerprints which differ from the stored ones
+    (both dicts of URLs to fingerprints) and marks them as stored.
+    Nothing is returned without fingerprints.
+    """
+
+    if fingerprints is None:
+        return list()
+
+    changed = _changed(fingerprints, stored)
+    rslt = pd.DataFrame({'League': league,
+                         'Season': season,
+                         'URL': list(changed.keys()),
+                         'Fingerprint': list(changed.values())})
+    rslt.Season = rslt.Season.astype(np.int32)
+    return rslt
+
+
+def _changed_validators(league, season, validators, stored):
+    """
+    Returns a pd.DataFrame of validators which differ from the stored ones
+    (both dicts of URLs to (ETag, Last-Modified) pairs, see make_request)
+    and marks them as stored. Nothing is returned without validators.
+    """
+
+    if validators is None:
+        return list()
+
+    changed = _changed(validators, stored)
+    rslt = pd.DataFrame(list((k, *v) for k, v in changed.items()),
+                        columns=['URL', 'ETag', 'LastModified'])
+    rslt.insert(0, 'League', league)
+    rslt.insert(1, 'Season', season)
+    rslt['ParserVersion'] = PARSER_VERSION
+    rslt = rslt.astype({'Season': np.int32,
+                        'ParserVersion': np.int32})
+    return rslt
+
+
+def iter_fetch_all(league, season, workers=1, skip=None, chunk_size=50,
+                   fingerprints=None, validators=None):
+    """
+    Generator version of fetch_all, yielding dicts of tables as soon as they
+    are fetched: lists of matches, teams and players, and information about
+    at most chunk_size matches, teams or players at a time (with players
+    whose pages were redirected as 'players_skipped'). Memory use does
+    not depend on the size of a season and yielded chunks can be inserted
+    right away. Tables without any rows are not yielded.
+    Fingerprints can map URLs of match, team and player pages to their
+    fingerprints when they were stored (see page_fingerprint), pages which
+    did not change are neither parsed nor yielded. Fingerprints of
+    the changed ones are yielded as 'pages_fingerprints' with the tables
+    parsed from them.
+    Validators can map URLs of match, team and player pages to their (ETag,
+    Last-Modified) pairs when they were stored by the current PARSER_VERSION
+    (see dbtools.get_validators), these pages are requested
+    conditionally (see make_request) and the ones not modified since are
+    neither downloaded nor parsed. New validators are yielded as
+    'pages_validators' with the tables parsed from their pages, so they are
+    never stored without them. Pages of hosts which do not send validators
+    are downloaded in full and compared by their fingerprints.
+    """
+
+    if skip is None:
+        skip = dict()
+
+    stored = dict()
+    if fingerprints is not None:
+        stored = dict(fingerprints)
+        fingerprints = dict(fingerprints)
+
+    stored_validators = dict()
+    if validators is not None:
+        stored_validators = dict(validators)
+        validators = dict(validators)
+
+    matches_list = fetch_matches(league, season)
+    yield _non_empty({'matches_list': matches_list})
+
+    # Only players' IDs are kept from the statistics, to extend players list
+    plist_stats = list()
+    # Statistics of matches which are skipped or unchanged are not parsed,
+    # their players are given by IDs from the stored ones
+    stats_ids = skip.get('StatsPlayerID', set())
+    if len(stats_ids) > 0:
+        plist_stats.append(pd.DataFrame({
+            'League': league,
+            'Season': np.int32(season),
+            'PlayerID': np.array(sorted(stats_ids), dtype=np.int64)}))
+    for matches in _chunks(_drop_known(matches_list, 'MatchID', skip),
+                           chunk_size):
+        matches_data = batch_fetch_match_info(matches, workers=workers,
+                                              fingerprints=fingerprints,
+                                              validators=validators)
+        if len(matches_data['stats']) > 0:
+            plist_stats.append(matches_data['stats'][['League', 'Season',
+                                                      'PlayerID']])
+
+        yield _non_empty({'matches_info': matches_data['information'],
+                          'matches_stats': matches_data['stats'],
+                          'matches_results': matches_data['results'],
+                          'pages_fingerprints': _changed_fingerprints(
+                              league, season, fingerprints, stored),
+                          'pages_validators': _changed_validators(
+                              league, season, validators,
+                              stored_validators)})
+
+    teams_list = fetch_teams(league, season)
+    yield _non_empty({'teams_list': teams_list})
+
+    for teams in _chunks(_drop_known(teams_list, 'TeamID', skip),
+                         chunk_size):
+        teams_data = batch_fetch_team_info(teams, workers=workers,
+                                           fingerprints=fingerprints,
+                                           validators=validators)
+        yield _non_empty({'teams_info': teams_data['information'],
+                          'teams_roster': teams_data['roster'],
+                          'pages_fingerprints': _changed_fingerprints(
+                              league, season, fingerprints, stored),
+                          'pages_validators': _changed_validators(
+                              league, season, validators,
+                              stored_validators)})
+
+    players_list = fetch_players(league, season)
     # Since players come and go, the full players list should be extended
     # by all players from statistics
-    plist_stats = tabs['matches_stats'][['League', 'Season', 'PlayerID']]
-    tabs['players_list'] = pd.concat([tabs['players_list'], plist_stats],
-                                     ignore_index=True).drop_duplicates()
-    tabs['players_list'] = tabs['players_list'].reset_index(drop=True)
+    if len(plist_stats) > 0:
+        players_list = pd.concat([players_list] + plist_stats,
+                                 ignore_index=True).drop_duplicates()
+    players_list = players_list.reset_index(drop=True)
 
     # Some matches with unnamed players in Stats pop-up
     # PlayerID = 0 crashes players_info, as it redirects to all players list
-    tabs['players_list'] = tabs['players_list'].query('PlayerID > 0')
+    players_list = players_list.query('PlayerID > 0')
+    yield _non_empty({'players_list': players_list})
+
+    for players in _chunks(_drop_known(players_list, 'PlayerID', skip),
+                           chunk_size):
+        unchanged = set()
+        players_info = batch_fetch_player_info(players, workers=workers,
+                                               fingerprints=fingerprints,
+                                               validators=validators,
+                                               unchanged=unchanged)
+
+        # Players whose pages were redirected, to be skipped in later runs
+        # (see dbtools.get_skipped_ids)
+        skipped = ~(players.PlayerID.isin(players_info.PlayerID) |
+                    players.PlayerID.isin(unchanged))
+        players_skipped = players.loc[skipped, ['League', 'Season',
+                                                'PlayerID']]
+        players_skipped = players_skipped.reset_index(drop=True)
+        yield _non_empty({'players_info': players_info,
+                          'players_skipped': players_skipped,
+                          'pages_fingerprints': _changed_fingerprints(
+                              league, season, fingerprints, stored),
+                          'pages_validators': _changed_validators(
+                              league, season, validators,
+                              stored_validators)})
+
+
+def fetch_all(league, season, workers=1, skip=None, fingerprints=None,
+              validators=None):
+    """
+    Fetches all tables for a given league and season. Workers are passed
+    to the batch functions.
+    For incremental refreshes, skip can map 'MatchID', 'TeamID' and 'PlayerID'
+    to sets of IDs whose pages are not fetched (lists are always complete)
+    and 'StatsPlayerID' to IDs of players in stored statistics, which extend
+    the players list like the fetched ones (see dbtools.get_complete_ids),
+    pages not modified since their validators were stored are not downloaded
+    and pages with unchanged fingerprints are not parsed (see iter_fetch_all).
+    Tables without any rows are not returned.
+    See iter_fetch_all for a version which does not keep everything in memory.
+    """
+
+    parts = dict()
+    for chunk in iter_fetch_all(league, season, workers=workers, skip=skip,
+                                fingerprints=fingerprints,
+                                validators=validators):
+        for key, tab in chunk.items():
+            parts.setdefault(key, list()).append(tab)
 
-    tabs['players_info'] = batch_fetch_player_info(tabs['players_list'])
+    tabs = dict()
+    for key, tables in parts.items():
+        if len(tables) == 1:
+            tabs[key] = tables[0]
+        else:
+            tabs[key] = pd.concat(tables, ignore_index=True)
 
     return tabs
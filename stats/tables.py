@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Aggregated statistics computed in bulk from the 'matches_stats' table.
+# Seasons in the old format (2008-2019) do not record BreakPoints,
+# PointsRatio, ServeSlashes and BlockAssists, the new ones do not record
+# ReceptionNegative. Such values stay missing (NaN) in all aggregates and
+# ratios, instead of being counted as zeros.
+
+import numpy as np
+import pandas as pd
+import sqlalchemy as sql
+import stats
+
+SET_COLUMNS = ['SetI', 'SetII', 'SetIII', 'SetIV', 'SetV', 'SetGolden']
+
+COUNT_COLUMNS = ['Points', 'BreakPoints', 'PointsRatio',
+                 'ServeTotal', 'ServeErrors', 'ServeAces', 'ServeSlashes',
+                 'ReceptionTotal', 'ReceptionErrors', 'ReceptionNegative',
+                 'ReceptionPositive', 'ReceptionPerfect',
+                 'AttackTotal', 'AttackBlocked', 'AttackErrors', 'AttackKills',
+                 'BlockPoints', 'BlockAssists']
+
+# Grouping columns of aggregates
+LEVELS = {'player': ['League', 'Season', 'TeamID', 'PlayerID'],
+          'team': ['League', 'Season', 'TeamID'],
+          'season': ['League', 'Season']}
+
+
+def load_stats(engine, leagues=None, seasons=None):
+    """
+    Reads 'matches_stats' (optionally only given leagues and seasons) with
+    compact types: counts as float32 (NaN where not recorded), IDs as int64
+    and set columns as flags of being on court in a set. When a player has
+    several versions of statistics in a match, only the latest one is kept.
+    """
+
+    # Set columns are reduced to flags already in the query
+    columns = (LEVELS['player'] + ['MatchID', 'Timestamp'] +
+               list('{col} IS NOT NULL'.format(col=x) for x in SET_COLUMNS) +
+               COUNT_COLUMNS)
+    query = 'SELECT {cols} FROM matches_stats'.format(cols=', '.join(columns))
+    conditions = list()
+    params = dict()
+    if leagues is not None:
+        conditions.append('League IN :leagues')
+        params['leagues'] = list(leagues)
+    if seasons is not None:
+        conditions.append('Season IN :seasons')
+        params['seasons'] = list(int(x) for x in seasons)
+    if len(conditions) > 0:
+        query += ' WHERE ' + ' AND '.join(conditions)
+
+    query = sql.text(query)
+    for name in params:
+        query = query.bindparams(sql.bindparam(name, expanding=True))
+
+    with engine.connect() as db_con:
+        rows = db_con.execute(query, params).fetchall()
+
+    # Arrays are built column by column, without intermediate objects per row
+    values = list(zip(*rows))
+    if len(values) == 0:
+        values = [()] * len(columns)
+
+    types = ([np.int32, np.int64, np.int64, np.int64, object] +
+             [bool] * len(SET_COLUMNS) +
+             [np.float32] * len(COUNT_COLUMNS))
+    names = (LEVELS['player'][1:] + ['MatchID', 'Timestamp'] +
+             SET_COLUMNS + COUNT_COLUMNS)
+    rslt = {'League': pd.Categorical(values[0])}
+    for name, dtype, column in zip(names, types, values[1:]):
+        rslt[name] = np.array(column, dtype=dtype)
+    rslt = pd.DataFrame(rslt)
+
+    # Timestamps are ISO strings, so they are ordered as text
+    keys = ['League', 'Season', 'MatchID', 'PlayerID']
+    if rslt.duplicated(keys).any():
+        rslt = rslt.sort_values('Timestamp', kind='stable')
+        rslt = rslt.drop_duplicates(keys, keep='last')
+        rslt = rslt.sort_index()
+
+    rslt = rslt.drop(columns=['Timestamp'])
+    rslt = rslt.reset_index(drop=True)
+    return rslt
+
+
+def aggregate(tab, level='player'):
+    """
+    Sums counts of statistics (see load_stats) by the grouping columns
+    of a given level (see LEVELS) and adds numbers of matches and sets.
+    Sets of a player are the ones the player was on court in, sets of a team
+    are all sets played by it. Matches and sets of a season are counted
+    once, not once for each team.
+    """
+
+    keys = LEVELS[level]
+    groups = tab.groupby(keys, observed=True, sort=True)
+
+    rslt = groups[COUNT_COLUMNS].sum(min_count=1)
+    if level == 'player':
+        # Rows are unique by player and match (see load_stats)
+        sets = tab[SET_COLUMNS].sum(axis=1)
+        sets = sets.groupby([tab[x] for x in keys], observed=True, sort=True)
+        rslt.insert(loc=0, column='Matches', value=groups.size())
+        rslt.insert(loc=1, column='SetsPlayed', value=sets.sum())
+    else:
+        # Sets of a team (or of both teams at the season level) in a match:
+        # the ones any of its players was in
+        matches = tab.groupby(keys + ['MatchID'], observed=True, sort=False)
+        matches = matches[SET_COLUMNS].any()
+        matches = matches.sum(axis=1).rename('SetsPlayed').reset_index()
+        matches = matches.groupby(keys, observed=True, sort=True)
+        rslt.insert(loc=0, column='Matches', value=matches.MatchID.count())
+        rslt.insert(loc=1, column='SetsPlayed', value=matches.SetsPlayed.sum())
+
+    rslt = rslt.reset_index()
+    return rslt
+
+
+def _ratio(numerator, denominator):
+    return numerator / denominator.where(denominator > 0)
+
+
+def add_ratios(tab):
+    """
+    Adds efficiencies and ratios to aggregated statistics (see aggregate),
+    NaN where a denominator is zero or an underlying count is not recorded.
+    """
+
+    rslt = tab.copy()
+
+    total = rslt.AttackTotal.where(rslt.AttackTotal > 0)
+    rslt['AttackEff'] = stats.attack_eff(kills=rslt.AttackKills,
+                                         errors=rslt.AttackErrors,
+                                         blocked=rslt.AttackBlocked,
+                                         total=total)
+    rslt['AttackKillPerc'] = _ratio(rslt.AttackKills, rslt.AttackTotal)
+
+    total = rslt.ServeTotal.where(rslt.ServeTotal > 0)
+    rslt['ServeEff'] = stats.serve_eff(aces=rslt.ServeAces,
+                                       slashes=rslt.ServeSlashes,
+                                       errors=rslt.ServeErrors,
+                                       total=total)
+    rslt['ServeAcePerc'] = _ratio(rslt.ServeAces, rslt.ServeTotal)
+
+    rslt['ReceptionPosPerc'] = _ratio(rslt.ReceptionPositive,
+                                      rslt.ReceptionTotal)
+    rslt['ReceptionPerfPerc'] = _ratio(rslt.ReceptionPerfect,
+                                       rslt.ReceptionTotal)
+    rslt['ReceptionErrPerc'] = _ratio(rslt.ReceptionErrors,
+                                      rslt.ReceptionTotal)
+
+    rslt['PointsSet'] = _ratio(rslt.Points, rslt.SetsPlayed)
+    rslt['BlocksSet'] = _ratio(rslt.BlockPoints, rslt.SetsPlayed)
+    rslt['BlockInvolvementSet'] = _ratio(rslt.BlockPoints + rslt.BlockAssists,
+                                         rslt.SetsPlayed)
+
+    return rslt
+
+
+def league_table(tab, level='player'):
+    """
+    Aggregates statistics (see load_stats) by a given level and adds ratios.
+    """
+
+    rslt = add_ratios(aggregate(tab, level=level))
+    return rslt
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Command line entry point: volleystats.py {create,backfill,refresh,export,
+# status,compare}. Subcommands run the numbered scripts, which import pandas,
+# SQLAlchemy and the scrapers only when one of them is chosen. The status
+# only reads the config and the database with sqlite3, so it starts fast
+# enough for cron health checks (exit code 1 if the database is missing).
+# Compare reports two run reports (see vsutils.metrics), exit code 1 means
+# a regression.
+
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+SCRIPTS = {'create': '00_create_databases.py',
+           'backfill': '01_insert_historical_data.py',
+           'refresh': '02_insert_current_data.py',
+           'export': '03_export_parquet.py'}
+
+HELP = {'create': 'create an empty database (removes an existing one)',
+        'backfill': 'fetch and insert past seasons',
+        'refresh': 'fetch and insert the current season',
+        'export': 'export tables into Parquet files',
+        'status': 'print the state of the database',
+        'compare': 'compare two run reports, flag regressions'}
+
+
+def _config_path():
+    # Same rules as vsutils.get_config_path, which would import pandas
+    rslt = os.environ.get('VOLLEYSTATS_CONFIG',
+                          os.path.join(ROOT, 'config.json'))
+    return os.path.abspath(rslt)
+
+
+def run_script(command):
+    import runpy
+
+    sys.path.insert(0, ROOT)
+    runpy.run_path(os.path.join(ROOT, SCRIPTS[command]), run_name='__main__')
+    return 0
+
+
+def _size(path):
+    rslt = 0
+    for curr in [path, path + '-wal']:
+        if os.path.exists(curr):
+            rslt += os.path.getsize(curr)
+    return rslt
+
+
+def status():
+    import json
+    import sqlite3
+
+    config_path = _config_path()
+    with open(config_path, 'r') as read_file:
+        config = json.load(read_file)
+    print('Config: {path}'.format(path=config_path))
+
+    rslt = 0
+    data_dir = os.path.join(os.path.dirname(config_path),
+                            config['paths']['data_dir'])
+    data_dir = os.path.normpath(data_dir)
+    for db_name, file_name in config['paths']['db_names'].items():
+        db_path = os.path.join(data_dir, file_name)
+        if not os.path.exists(db_path):
+            print('Database {db}: missing ({path})'.format(db=db_name,
+                                                           path=db_path))
+            rslt = 1
+            continue
+
+        db_con = sqlite3.connect('file:' + db_path + '?mode=ro', uri=True)
+        try:
+            names = list(x[0] for x in db_con.execute(
+                "SELECT name FROM sqlite_master "
+                "WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite_%' "
+                "AND name NOT LIKE '%\\_data' ESCAPE '\\' ORDER BY name"))
+            compact = 'schema_info' in names
+            line = 'Database {db}: {path}, {size:.1f} MB, {layout} layout'
+            print(line.format(
+                db=db_name,
+                path=db_path,
+                size=_size(db_path) / 2**20,
+                layout='compact' if compact else 'plain'))
+
+            for name in names:
+                if name in ['strings', 'schema_info']:
+                    continue
+                n = db_con.execute(
+                    'SELECT COUNT(*) FROM "{tab}"'.format(tab=name)).fetchone()
+                print('  {tab:<28}{n:>10}'.format(tab=name, n=n[0]))
+
+            if 'matches_list' in names:
+                print('  Latest seasons:')
+                latest = db_con.execute(
+                    'SELECT League, MAX(Season), MAX(Timestamp) '
+                    'FROM matches_list GROUP BY League ORDER BY League')
+                for league, season, stamp in latest:
+                    line = '    {league}: {start}/{end}, updated {stamp}'
+                    print(line.format(
+                        league=league,
+                        start=season,
+                        end=season + 1,
+                        stamp=stamp))
+        finally:
+            db_con.close()
+
+    return rslt
+
+
+def compare(old_path, new_path, threshold):
+    sys.path.insert(0, ROOT)
+    import vsutils.metrics as metrics
+
+    old = metrics.read_report(old_path)
+    new = metrics.read_report(new_path)
+    regressions = metrics.compare(old, new, threshold=threshold)
+    flagged = set(x[0] for x in regressions)
+
+    line = ('{flag:<2}{stage:<28}'
+            '{old_mean:>12}{new_mean:>12}{old_rps:>12}{new_rps:>12}')
+    print(line.format(flag='', stage='stage', old_mean='mean old',
+                      new_mean='mean new', old_rps='rows/s old',
+                      new_rps='rows/s new'))
+    for stage in sorted(set(old['stages']) | set(new['stages'])):
+        values = list()
+        for report in [old, new]:
+            curr = report['stages'].get(stage, dict())
+            for key, spec in [('mean', '{:.4f}'), ('rows_per_s', '{:.0f}')]:
+                value = curr.get(key)
+                values.append('-' if value is None else spec.format(value))
+        print(line.format(flag='!' if stage in flagged else '',
+                          stage=stage,
+                          old_mean=values[0], old_rps=values[1],
+                          new_mean=values[2], new_rps=values[3]))
+
+    for stage, measure, prev, curr in regressions:
+        line = 'Regression of {stage}: {measure} {prev:.4g} -> {curr:.4g}'
+        print(line.format(stage=stage, measure=measure, prev=prev, curr=curr))
+
+    return 1 if len(regressions) > 0 else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='volleystats')
+    parser.add_argument('--config',
+                        help='path of the config file (by default '
+                             'VOLLEYSTATS_CONFIG or config.json next to '
+                             'this script)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    for command in list(SCRIPTS) + ['status']:
+        commands.add_parser(command, help=HELP[command])
+    parser_compare = commands.add_parser('compare', help=HELP['compare'])
+    parser_compare.add_argument('old', help='report of the reference run')
+    parser_compare.add_argument('new', help='report of the compared run')
+    parser_compare.add_argument('--threshold', type=float, default=0.2,
+                                help='relative change flagged as a regression '
+                                     '(default: 0.2)')
+    args = parser.parse_args(argv)
+
+    # Passed through the environment, so that worker processes get it too
+    if args.config is not None:
+        os.environ['VOLLEYSTATS_CONFIG'] = os.path.abspath(args.config)
+
+    if args.command == 'status':
+        return status()
+    if args.command == 'compare':
+        return compare(args.old, args.new, args.threshold)
+    return run_script(args.command)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
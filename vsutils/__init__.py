@@ -2,17 +2,76 @@
 # -*- coding: utf-8 -*-
 
 import json
+import os
+import threading
 import pandas as pd
 import datetime as dttm
 import hashlib
+import vsutils.metrics as metrics
+
+# Environment variable with a path of the configuration file, used unless
+# set_config_path is called. By default config.json of the repository root.
+CONFIG_ENV = 'VOLLEYSTATS_CONFIG'
+DEFAULT_CONFIG = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'config.json')
+
+_config = {'path': None, 'value': None}
+_config_lock = threading.Lock()
+
+
+def get_config_path():
+    rslt = _config['path']
+    if rslt is None:
+        rslt = os.environ.get(CONFIG_ENV, DEFAULT_CONFIG)
+    return os.path.abspath(rslt)
+
+
+def set_config_path(path):
+    """
+    Sets the configuration file used by get_config, the cached
+    configuration is read again on the next call.
+    """
+
+    with _config_lock:
+        _config['path'] = os.path.abspath(path)
+        _config['value'] = None
+
+
+def reload_config():
+    """
+    Reads the configuration file again, returns the new configuration.
+    """
+
+    with _config_lock:
+        with open(get_config_path(), 'r') as read_file:
+            _config['value'] = json.load(read_file)
+
+    return _config['value']
+
 
 def get_config():
-    with open('config.json', 'r') as read_file:
-        config = json.load(read_file)
+    """
+    Returns the configuration, read once per process (see reload_config).
+    The returned dict is shared, it should not be modified.
+    """
+
+    config = _config['value']
+    if config is None:
+        config = reload_config()
 
     return config
 
 
+def resolve_path(path):
+    """
+    Returns an absolute path of a path from the configuration, relative
+    paths are relative to the directory of the configuration file.
+    """
+
+    rslt = os.path.join(os.path.dirname(get_config_path()), path)
+    return os.path.normpath(rslt)
+
+
 def df_colattach1(df1, tab):
     n = df1.shape[0]
     if n != 1:
@@ -38,8 +97,53 @@ def create_hash(values):
     return rslt
 
 
-def add_hash(tab):
-    hashes = tab.apply(create_hash, axis=1)
+def create_hashes(tab):
+    """
+    Column-wise equivalent of tab.apply(create_hash, axis=1). Every column is
+    converted to strings once and rows are only joined and hashed, without
+    building a pd.Series per row. Values are converted to the same types as in
+    the row-wise apply, so the hashes are identical.
+    """
+
+    # Row-wise apply upcasts rows of tables without object columns
+    # to a common type, such tables (none in the database) are left to it
+    if all(x != object for x in tab.dtypes):
+        return tab.apply(create_hash, axis=1)
+
+    columns = list()
+    for col in tab.columns:
+        values = tab[col]
+        if values.dtype.kind in 'iu':
+            # Integer columns have few distinct values, each one is formatted
+            # only once
+            codes, uniques = pd.factorize(values.to_numpy())
+            strings = list(map(str, uniques.tolist()))
+            # Missing values of nullable columns get code -1, which indexes
+            # the last string, formatted as in the row-wise apply
+            strings.append(str(pd.NA))
+            strings = pd.Series(strings, dtype=object)
+            columns.append(strings.to_numpy()[codes].tolist())
+        else:
+            columns.append(list(map(str, values.to_numpy(dtype=object))))
+
+    rows = (' '.join(row).encode() for row in zip(*columns))
+
+    rslt = list(hashlib.md5(row).hexdigest() for row in rows)
+    rslt = pd.Series(rslt, index=tab.index, dtype=object)
+    return rslt
+
+
+# Hashing schemes for add_hash, both produce the same hashes:
+#   'row' - original row-wise apply of create_hash,
+#   'columnar' - create_hashes working column by column (much faster)
+HASH_SCHEMES = {'row': lambda tab: tab.apply(create_hash, axis=1),
+                'columnar': create_hashes}
+
+
+def add_hash(tab, scheme='columnar'):
+    with metrics.timer('hash') as counts:
+        hashes = HASH_SCHEMES[scheme](tab)
+        counts['rows'] = len(tab)
     tab.insert(loc=tab.shape[1],
                column='Hash',
                value=hashes)
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Per-stage metrics of a run: requests, parsing of every page type, hashing
+# and inserts record their counts, durations, bytes and rows here. Stages are
+# named '{kind}.{detail}', e.g. 'request.network', 'parse.match_info',
+# 'insert.matches_stats'. Metrics are kept per process, worker processes
+# send theirs to the parent (see snapshot and merge).
+
+import contextlib
+import datetime as dttm
+import json
+import os
+import threading
+import time
+
+# Upper bounds (in seconds) of buckets of latency histograms, the last
+# bucket takes everything longer
+BUCKETS = [0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5,
+           1, 2, 5, 10, 30]
+
+# Relative change of a stage considered a regression by compare
+THRESHOLD = 0.2
+
+_stages = dict()
+_lock = threading.Lock()
+_started = {'time': dttm.datetime.now()}
+
+
+def _new_stage():
+    return {'count': 0,
+            'seconds': 0.0,
+            'max': 0.0,
+            'bytes': 0,
+            'rows': 0,
+            'histogram': [0] * (len(BUCKETS) + 1)}
+
+
+def _bucket(seconds):
+    for i, bound in enumerate(BUCKETS):
+        if seconds <= bound:
+            return i
+    return len(BUCKETS)
+
+
+def record(stage, seconds, rows=0, nbytes=0):
+    """
+    Records one event of a stage which took a given number of seconds and
+    processed rows and bytes.
+    """
+
+    with _lock:
+        curr = _stages.get(stage)
+        if curr is None:
+            curr = _stages[stage] = _new_stage()
+        curr['count'] += 1
+        curr['seconds'] += seconds
+        curr['max'] = max(curr['max'], seconds)
+        curr['bytes'] += nbytes
+        curr['rows'] += rows
+        curr['histogram'][_bucket(seconds)] += 1
+
+
+@contextlib.contextmanager
+def timer(stage):
+    """
+    Times the block as one event of a stage. Yields a dict, rows and bytes
+    processed in the block can be set as its 'rows' and 'bytes'.
+    """
+
+    counts = {'rows': 0, 'bytes': 0}
+    start = time.perf_counter()
+    yield counts
+    record(stage, time.perf_counter() - start,
+           rows=counts['rows'], nbytes=counts['bytes'])
+
+
+def reset():
+    """
+    Drops all recorded metrics and starts a new run.
+    """
+
+    with _lock:
+        _stages.clear()
+        _started['time'] = dttm.datetime.now()
+
+
+def snapshot(clear=False):
+    """
+    Returns a copy of the recorded stages (to be merged in another process,
+    see merge), with clear the recorded ones are dropped.
+    """
+
+    with _lock:
+        rslt = {k: dict(v, histogram=list(v['histogram']))
+                for k, v in _stages.items()}
+        if clear:
+            _stages.clear()
+
+    return rslt
+
+
+def merge(stages):
+    """
+    Adds stages from snapshot (e.g. of a worker process) to the recorded ones.
+    """
+
+    with _lock:
+        for stage, values in stages.items():
+            curr = _stages.get(stage)
+            if curr is None:
+                curr = _stages[stage] = _new_stage()
+            for key in ['count', 'seconds', 'bytes', 'rows']:
+                curr[key] += values[key]
+            curr['max'] = max(curr['max'], values['max'])
+            curr['histogram'] = list(
+                x + y for x, y in zip(curr['histogram'], values['histogram']))
+
+
+def _quantile(histogram, q):
+    """
+    Returns the upper bound of the histogram bucket with the q-th quantile.
+    """
+
+    total = sum(histogram)
+    if total == 0:
+        return None
+
+    seen = 0
+    for i, n in enumerate(histogram):
+        seen += n
+        if seen >= q * total:
+            return BUCKETS[i] if i < len(BUCKETS) else None
+    return None
+
+
+def summary(stages=None):
+    """
+    Returns stages (by default the recorded ones) with derived values:
+    mean and quantiles of durations, rows and bytes per second.
+    """
+
+    if stages is None:
+        stages = snapshot()
+
+    rslt = dict()
+    for stage, values in sorted(stages.items()):
+        curr = dict(values)
+        seconds = values['seconds']
+        curr['mean'] = seconds / values['count'] if values['count'] else None
+        curr['p50'] = _quantile(values['histogram'], 0.5)
+        curr['p95'] = _quantile(values['histogram'], 0.95)
+        curr['rows_per_s'] = values['rows'] / seconds if seconds else None
+        curr['bytes_per_s'] = values['bytes'] / seconds if seconds else None
+        rslt[stage] = curr
+
+    return rslt
+
+
+def report(**info):
+    """
+    Returns a report of the run as a dict: times, additional info
+    (e.g. a command and its arguments) and summary of all stages.
+    """
+
+    rslt = {'started': _started['time'].isoformat(timespec='seconds'),
+            'finished': dttm.datetime.now().isoformat(timespec='seconds'),
+            'info': info,
+            'buckets': BUCKETS,
+            'stages': summary()}
+    return rslt
+
+
+def write_report(report_dir, name, **info):
+    """
+    Writes a JSON report of the run (see report) into report_dir, named by
+    name and the start of the run. Returns its path.
+    """
+
+    rslt = os.path.join(report_dir, '{name}_{stamp}.json'.format(
+        name=name,
+        stamp=_started['time'].strftime('%Y%m%d_%H%M%S')))
+
+    os.makedirs(report_dir, exist_ok=True)
+    with open(rslt, 'w') as file:
+        json.dump(report(name=name, **info), file, indent=1)
+
+    return rslt
+
+
+def read_report(path):
+    with open(path, 'r') as file:
+        rslt = json.load(file)
+    return rslt
+
+
+def compare(old, new, threshold=THRESHOLD, min_count=5):
+    """
+    Compares stages of two reports (see report). Returns a list of
+    (stage, measure, old value, new value) for regressions: mean duration
+    or p95 longer, or rows per second lower, by more than threshold
+    (relative). Stages with fewer than min_count events in either run
+    are not compared.
+    """
+
+    rslt = list()
+    for stage, curr in new['stages'].items():
+        prev = old['stages'].get(stage)
+        if prev is None:
+            continue
+        if min(prev['count'], curr['count']) < min_count:
+            continue
+
+        for measure in ['mean', 'p95']:
+            if prev[measure] and curr[measure] and \
+                    curr[measure] > prev[measure] * (1 + threshold):
+                rslt.append((stage, measure, prev[measure], curr[measure]))
+
+        measure = 'rows_per_s'
+        if prev[measure] and curr[measure] is not None and \
+                curr[measure] < prev[measure] * (1 - threshold):
+            rslt.append((stage, measure, prev[measure], curr[measure]))
+
+    return rslt